@@ -0,0 +1,70 @@
+import os
+
+from PIL import Image
+
+from lsb_engine import DEFAULT_LAYOUT
+
+
+# Режимы, пригодные для встраивания в каналы R/G/B без потери данных при преобразовании в RGB
+CONTAINER_MODES = ('RGB', 'RGBA', 'RGBX')
+# Байт на канал для режимов PIL (для остальных режимов – 1 байт)
+_BYTES_PER_BAND = {'I;16': 2, 'I;16B': 2, 'I;16L': 2, 'I': 4, 'F': 4}
+# Бит на канал (для остальных режимов – 8 бит)
+_BITS_PER_BAND = {'1': 1, 'I;16': 16, 'I;16B': 16, 'I;16L': 16, 'I': 32, 'F': 32}
+IMAGE_EXTENSIONS = ('.bmp', '.png', '.tif', '.tiff', '.ppm')
+
+
+# Заголовок изображения без декодирования пикселей: Image.open читает только заголовок файла
+def read_image_header(path):
+    with Image.open(path) as img:
+        width, height = img.size
+        mode, image_format = img.mode, img.format
+        bands = len(img.getbands())
+    return {
+        'width': width,
+        'height': height,
+        'mode': mode,
+        'format': image_format,
+        'bands': bands,
+        'bit_depth': _BITS_PER_BAND.get(mode, 8) * bands,  # бит на пиксель
+        # Размер массива np.array(img) – то, что раньше считалось полным декодированием
+        'memory_size': width * height * bands * _BYTES_PER_BAND.get(mode, 1),
+    }
+
+
+# Ёмкость контейнера в битах нагрузки для схемы layout (по заголовку)
+def container_capacity(path, layout=DEFAULT_LAYOUT, header=None):
+    header = header or read_image_header(path)
+    return layout.capacity(header['width'], header['height'])
+
+
+# Решение о допуске контейнера: помещается ли payload_bits бит (число или нагрузка) при схеме layout
+def admit_container(path, payload_bits, layout=DEFAULT_LAYOUT):
+    if hasattr(payload_bits, '__len__'):
+        payload_bits = len(payload_bits)
+    result = {'path': path, 'payload_bits': payload_bits, 'accepted': False}
+    try:
+        header = read_image_header(path)
+    except (OSError, ValueError) as e:
+        result['reason'] = f"не удалось прочитать заголовок: {e}"
+        return result
+
+    capacity = container_capacity(path, layout, header)
+    result.update(width=header['width'], height=header['height'], mode=header['mode'], capacity=capacity)
+    if header['mode'] not in CONTAINER_MODES:
+        result['reason'] = f"режим {header['mode']} не подходит для встраивания в RGB-каналы"
+    elif capacity < payload_bits:
+        result['reason'] = f"ёмкость {capacity} бит меньше нагрузки {payload_bits} бит"
+    else:
+        result['accepted'] = True
+        result['reason'] = None
+    return result
+
+
+# Проверка всех изображений каталога без декодирования пикселей; список результатов admit_container
+def scan_containers(directory, payload_bits, layout=DEFAULT_LAYOUT, extensions=IMAGE_EXTENSIONS):
+    results = []
+    for name in sorted(os.listdir(directory)):
+        if os.path.splitext(name)[1].lower() in extensions:
+            results.append(admit_container(os.path.join(directory, name), payload_bits, layout))
+    return results
@@ -0,0 +1,198 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import instrument
+from qr_gen import qr_payload_cache
+from metrics import compute_metrics
+from admission import IMAGE_EXTENSIONS
+from lsb_engine import EmbeddingLayout, load_rgb_array, save_rgb_array
+from stego_header import embed_with_header, extract_with_header
+from steganalysis import DEFAULT_SEGMENTS, analyze_image
+
+
+# Нагрузка для данных задания; повторяющиеся данные в пределах процесса берутся из кэша
+def _job_payload(job):
+    qr_size = None if job['compact'] else tuple(job['qr_size'])
+    return qr_payload_cache.get(job['data'], qr_size)
+
+
+# Встраивание: контейнер -> стего-изображение с заголовком, метрики по массивам в памяти
+def _embed_job(job):
+    payload = _job_payload(job)
+    container = load_rgb_array(job['container'])
+    stego = container.copy()
+    embed_with_header(stego, payload, job['layout'], job['block_size'])
+    save_rgb_array(stego, job['output'])
+    metrics = compute_metrics(container, stego)
+    return {'output': job['output'], 'payload_bits': len(payload), 'pixels': container.shape[0] * container.shape[1],
+            'mse': metrics['mse'], 'nmse': metrics['nmse'], 'psnr': metrics['psnr']}
+
+
+# Извлечение: стего-изображение -> восстановленный QR-код (заголовок описывает нагрузку)
+def _extract_job(job):
+    payload = extract_with_header(job['container'])
+    if job['output'] is not None:
+        payload.to_image().save(job['output'])
+    width, height = payload.size or (0, 0)
+    return {'output': job['output'], 'payload_bits': len(payload), 'qr_size': [width, height]}
+
+
+# Проверка: встраивание и извлечение в памяти, без записи файлов
+def _verify_job(job):
+    payload = _job_payload(job)
+    container = load_rgb_array(job['container'])
+    stego = container.copy()
+    embed_with_header(stego, payload, job['layout'], job['block_size'])
+    verified = extract_with_header(stego) == payload
+    metrics = compute_metrics(container, stego)
+    return {'verified': bool(verified), 'payload_bits': len(payload), 'pixels': container.shape[0] * container.shape[1],
+            'mse': metrics['mse'], 'nmse': metrics['nmse'], 'psnr': metrics['psnr']}
+
+
+# Стегоанализ: оценка обнаружимости встраивания в каналы схемы (хи-квадрат, RS-анализ)
+def _analyze_job(job):
+    report = analyze_image(job['container'], job['layout'].channels, job['segments'])
+    return {'pixels': report['width'] * report['height'], **report}
+
+
+_JOBS = {'embed': _embed_job, 'extract': _extract_job, 'verify': _verify_job, 'analyze': _analyze_job}
+
+
+# Выполнение одного задания в рабочем процессе; ошибка файла не прерывает весь прогон.
+# С job['instrument'] в результат попадает поэтапная статистика (instrument.snapshot()),
+# с job['profile'] задание выполняется под cProfile, профиль сохраняется по этому пути.
+def run_job(job):
+    start = time.perf_counter()
+    result = {'container': job['container'], 'status': 'ok'}
+    if job.get('instrument'):
+        instrument.enable()
+        instrument.reset()
+    try:
+        if job.get('profile'):
+            with instrument.profile(job['profile']):
+                result.update(_JOBS[job['command']](job))
+        else:
+            result.update(_JOBS[job['command']](job))
+        if result.get('verified') is False:
+            result['status'] = 'mismatch'
+    except Exception as e:  # noqa: BLE001 – в отчёт попадает любая ошибка отдельного файла
+        result.update(status='error', error=f"{type(e).__name__}: {e}")
+    result['seconds'] = time.perf_counter() - start
+    if job.get('instrument'):
+        result['stats'] = instrument.snapshot()
+    return result
+
+
+# Задания из каталога контейнеров (одни и те же данные для всех) или из CSV-манифеста
+# с колонками container, data и необязательной output
+def build_jobs(args):
+    options = {'command': args.command, 'compact': args.compact, 'qr_size': args.qr_size,
+               'block_size': args.block_size, 'segments': args.segments, 'instrument': bool(args.stats),
+               'layout': EmbeddingLayout(args.channels, args.bits_per_channel, args.order)}
+    suffix = '.png' if args.command == 'extract' else '.bmp'
+    rows = []
+    if args.manifest:
+        with open(args.manifest, newline='', encoding='utf-8') as f:
+            rows = [(row['container'], row.get('data') or args.data, row.get('output')) for row in csv.DictReader(f)]
+    else:
+        for name in sorted(os.listdir(args.containers)):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                rows.append((os.path.join(args.containers, name), args.data, None))
+
+    jobs = []
+    for container, data, output in rows:
+        if not output and args.out and args.command in ('embed', 'extract'):
+            output = os.path.join(args.out, os.path.splitext(os.path.basename(container))[0] + suffix)
+        jobs.append(dict(options, container=container, data=data, output=output or None))
+        if args.profile and os.path.basename(container) == args.profile:
+            jobs[-1]['profile'] = os.path.splitext(args.report)[0] + '.prof'
+    return jobs
+
+
+# Параллельный прогон: задания раздаются рабочим процессам пачками по chunksize
+def run_batch(jobs, workers=None, chunksize=None):
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (workers * 4))
+    start = time.perf_counter()
+    if workers == 1:
+        results = [run_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_job, jobs, chunksize=chunksize))
+    return results, time.perf_counter() - start
+
+
+# Сводный отчёт: число успешных/ошибочных файлов, пропускная способность, средние метрики
+def summarize(results, elapsed, workers):
+    ok = [r for r in results if r['status'] == 'ok']
+    pixels = sum(r.get('pixels', 0) for r in ok)
+    summary = {
+        'total': len(results),
+        'ok': len(ok),
+        'failed': len(results) - len(ok),
+        'workers': workers,
+        'elapsed_seconds': elapsed,
+        'images_per_second': len(results) / elapsed if elapsed else 0.0,
+        'megapixels_per_second': pixels / elapsed / 1e6 if elapsed else 0.0,
+    }
+    for key in ('mse', 'nmse', 'score'):
+        values = [r[key] for r in ok if key in r]
+        if values:
+            summary[f'mean_{key}'] = float(np.mean(values))
+    return {'summary': summary, 'results': results}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетное встраивание/извлечение QR-кодов в синий канал и стегоанализ")
+    parser.add_argument('command', choices=sorted(_JOBS))
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--containers', help="каталог с изображениями")
+    source.add_argument('--manifest', help="CSV с колонками container, data[, output]")
+    parser.add_argument('--data', default="КубышевАртём", help="данные QR-кода для режима каталога")
+    parser.add_argument('--out', help="каталог для результатов")
+    parser.add_argument('--report', default='batch_report.json', help="путь к JSON-отчёту")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=None)
+    parser.add_argument('--qr-size', type=int, nargs=2, default=(100, 100))
+    parser.add_argument('--compact', action='store_true', help="встраивать матрицу модулей QR-кода")
+    parser.add_argument('--block-size', type=int, default=1, help="кратность повторения каждого бита")
+    parser.add_argument('--channels', type=int, nargs='+', default=[2])
+    parser.add_argument('--bits-per-channel', type=int, default=1)
+    parser.add_argument('--order', choices=EmbeddingLayout.ORDERS, default='pixel')
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS,
+                        help="число полос последовательной атаки хи-квадрат (analyze)")
+    parser.add_argument('--stats', help="JSON lines с поэтапной статистикой каждого задания")
+    parser.add_argument('--profile', metavar='FILE', help="имя контейнера, задание которого профилируется "
+                                                          "через cProfile (профиль рядом с отчётом, .prof)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    jobs = build_jobs(args)
+    workers = args.workers or os.cpu_count() or 1
+    results, elapsed = run_batch(jobs, workers, args.chunksize)
+    report = summarize(results, elapsed, workers)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.stats:
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            for result in results:
+                instrument.write_jsonl(f, result.get('stats', {}), container=result['container'])
+
+    summary = report['summary']
+    print(f"Обработано {summary['total']} файлов: успешно {summary['ok']}, с ошибками {summary['failed']} "
+          f"за {elapsed:.2f} с ({summary['images_per_second']:.1f} изобр./с). Отчёт: {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows: пиковый RSS не измеряется
+    resource = None
+
+import ReadyKurs
+import testOneCh
+import testBLOCKS
+from lsb_engine import load_rgb_array, save_rgb_array
+
+
+# Размеры синтетических контейнеров (ширина, высота)
+SIZES = {
+    '100x100': (100, 100),
+    'VGA': (640, 480),
+    'FullHD': (1920, 1080),
+    '4K': (3840, 2160),
+    '8K': (7680, 4320),
+}
+DEFAULT_THRESHOLD = 0.2  # допустимое замедление относительно базовой линии (20 %)
+MIN_SECONDS = 0.0005  # этапы быстрее этого времени не сравниваются – это шум таймера
+MAX_BLOCK_SIZE = 230  # размер блока testBLOCKS.py
+
+
+# Пиковый RSS процесса в мегабайтах (ru_maxrss – КиБ в Linux, байты в macOS)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# Синтетический контейнер: случайный шум, сохранённый как BMP
+def make_container(path, width, height, seed=0):
+    rgb = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    Image.fromarray(rgb).save(path)
+    return rgb
+
+
+# Лучшее время из repeat запусков fn; вывод print скриптов подавляется
+def time_stage(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _rates(seconds, pixels, bits):
+    return {
+        'seconds': seconds,
+        'pixels_per_second': pixels / seconds if seconds else None,
+        'bits_per_second': bits / seconds if bits and seconds else None,
+    }
+
+
+# Все этапы ReadyKurs.py, testOneCh.py и testBLOCKS.py для одного размера контейнера
+def bench_size(width, height, workdir, data, qr_size, repeat):
+    pixels = width * height
+    container = os.path.join(workdir, f'container_{width}x{height}.bmp')
+    stego = os.path.join(workdir, 'stego.bmp')
+    block_stego = os.path.join(workdir, 'stego_blocks.bmp')
+    qr_path = os.path.join(workdir, 'qr.bmp')
+    copy_path = os.path.join(workdir, 'copy.bmp')
+    rgb = make_container(container, width, height)
+
+    stages = {}
+    seconds, _ = time_stage(lambda: ReadyKurs.generate_qr_code(data, qr_path, qr_size), repeat)
+    stages['qr_generation'] = _rates(seconds, qr_size[0] * qr_size[1], qr_size[0] * qr_size[1])
+    seconds, (bits, _) = time_stage(lambda: ReadyKurs.image_to_bits(qr_path), repeat)
+    stages['image_to_bits'] = _rates(seconds, len(bits), len(bits))
+    payload_bits = min(len(bits), pixels)
+
+    seconds, _ = time_stage(lambda: ReadyKurs.hide_data_in_blue_channel(container, bits, stego), repeat)
+    stages['embed'] = _rates(seconds, pixels, payload_bits)
+    seconds, _ = time_stage(lambda: ReadyKurs.extract_data_from_blue_channel(stego, len(bits)), repeat)
+    stages['extract'] = _rates(seconds, pixels, payload_bits)
+
+    # Блочное встраивание: самый большой блок (не больше 230), при котором нагрузка помещается
+    block_size = min(MAX_BLOCK_SIZE, pixels // len(bits))
+    if block_size >= 1:
+        seconds, _ = time_stage(lambda: testBLOCKS.hide_data_in_blue_channel(container, bits, block_stego,
+                                                                             block_size), repeat)
+        stages['block_embed'] = dict(_rates(seconds, pixels, len(bits)), block_size=block_size)
+        seconds, _ = time_stage(lambda: testBLOCKS.extract_data_from_blue_channel(block_stego, len(bits),
+                                                                                  block_size), repeat)
+        stages['block_majority_decode'] = dict(_rates(seconds, pixels, len(bits)), block_size=block_size)
+
+    seconds, _ = time_stage(lambda: ReadyKurs.calculate_mse(container, stego), repeat)
+    stages['mse'] = _rates(seconds, pixels, None)
+    seconds, _ = time_stage(lambda: ReadyKurs.calculate_nmse(container, stego), repeat)
+    stages['nmse'] = _rates(seconds, pixels, None)
+    seconds, _ = time_stage(lambda: testOneCh.calculate_mse(container, stego), repeat)
+    stages['mse_blue'] = _rates(seconds, pixels, None)
+    seconds, _ = time_stage(lambda: testOneCh.calculate_nmse(container, stego), repeat)
+    stages['nmse_blue'] = _rates(seconds, pixels, None)
+
+    seconds, _ = time_stage(lambda: save_rgb_array(rgb, copy_path), repeat)
+    stages['save'] = _rates(seconds, pixels, None)
+    seconds, _ = time_stage(lambda: load_rgb_array(copy_path), repeat)
+    stages['load'] = _rates(seconds, pixels, None)
+
+    for path in (container, stego, block_stego, qr_path, copy_path):
+        if os.path.exists(path):
+            os.remove(path)
+    # RSS растёт монотонно; размеры идут по возрастанию, поэтому значение относится к этому размеру
+    return {'width': width, 'height': height, 'payload_bits': len(bits), 'peak_rss_mb': peak_rss_mb(),
+            'stages': stages}
+
+
+# Прогон по всем размерам; результат – словарь, пригодный для сохранения базовой линии в JSON
+def run_benchmarks(sizes=tuple(SIZES), data="КубышевАртём", qr_size=(100, 100), repeat=3, workdir=None):
+    results = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for name in sorted(sizes, key=lambda s: SIZES[s][0] * SIZES[s][1]):
+            results[name] = bench_size(*SIZES[name], tmp, data, qr_size, repeat)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'qr_size': list(qr_size),
+        },
+        'results': results,
+    }
+
+
+# Сравнение с базовой линией: список этапов, замедлившихся больше чем на threshold
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_seconds=MIN_SECONDS):
+    regressions = []
+    for name, result in current['results'].items():
+        base_stages = baseline['results'].get(name, {}).get('stages', {})
+        for stage, stats in result['stages'].items():
+            base = base_stages.get(stage)
+            if base is None or max(base['seconds'], stats['seconds']) < min_seconds:
+                continue
+            ratio = stats['seconds'] / base['seconds']
+            if ratio > 1 + threshold:
+                regressions.append({'size': name, 'stage': stage, 'baseline_seconds': base['seconds'],
+                                    'seconds': stats['seconds'], 'ratio': ratio})
+    return regressions
+
+
+# Таблица результатов: время этапа (мс) и пропускная способность (Мпикс/с)
+def format_report(report):
+    lines = []
+    for name, result in report['results'].items():
+        rss = result['peak_rss_mb']
+        lines.append(f"{name} ({result['width']}x{result['height']}, нагрузка {result['payload_bits']} бит, "
+                     f"пиковый RSS {'н/д' if rss is None else f'{rss:.0f} МБ'})")
+        for stage, stats in result['stages'].items():
+            mpix = stats['pixels_per_second'] / 1e6 if stats['pixels_per_second'] else 0.0
+            bits = f"{stats['bits_per_second'] / 1e6:10.1f} Мбит/с" if stats['bits_per_second'] else ''
+            lines.append(f"  {stage:<22}{stats['seconds'] * 1000:10.2f} мс{mpix:10.1f} Мпикс/с{bits}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности этапов встраивания/извлечения")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--repeat', type=int, default=3, help="число повторов, берётся лучшее время")
+    parser.add_argument('--data', default="КубышевАртём")
+    parser.add_argument('--qr-size', type=int, nargs=2, default=(100, 100))
+    parser.add_argument('--output', default='benchmark.json', help="куда сохранить результаты (JSON)")
+    parser.add_argument('--baseline', help="JSON базовой линии для сравнения")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="порог замедления, например 0.2 = 20 %%")
+    parser.add_argument('--workdir', help="каталог для временных файлов")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args.sizes, args.data, tuple(args.qr_size), args.repeat, args.workdir)
+    print(format_report(report))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for r in regressions:
+            print(f"РЕГРЕССИЯ {r['size']} {r['stage']}: {r['baseline_seconds'] * 1000:.2f} мс -> "
+                  f"{r['seconds'] * 1000:.2f} мс (x{r['ratio']:.2f})")
+        if regressions:
+            return 1
+        print(f"Регрессий больше {args.threshold:.0%} нет")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import numpy as np
+
+from lsb_engine import BLUE, bits_to_array, embed_bits_array
+from instrument import stage
+
+
+# Повторяем каждый бит нагрузки block_size раз (кодирование повторением) одной операцией np.repeat
+def repeat_bits(data_bits, block_size):
+    return np.repeat(bits_to_array(data_bits), block_size)
+
+
+# Записываем нагрузку блоками: каждый бит занимает block_size подряд идущих пикселей синего канала.
+# Возвращает число записанных бит канала (с учётом обрезки по размеру контейнера).
+def embed_blocks_array(rgb, data_bits, block_size, channel=BLUE):
+    return embed_bits_array(rgb, repeat_bits(data_bits, block_size), channel)
+
+
+# Мажоритарное декодирование плоскости младших битов.
+# lsb_plane – одномерный массив младших битов в порядке обхода пикселей.
+# Возвращает (биты, запас голосов): запас – сколько голосов должно измениться, чтобы бит перевернулся.
+# У блоков, не поместившихся в изображение целиком, запас равен 0: их биты не были встроены.
+def majority_decode(lsb_plane, num_bits, block_size):
+    needed = num_bits * block_size
+    with stage('block_decode') as st:
+        votes = np.zeros(needed, dtype=np.uint8)
+        n = min(needed, lsb_plane.size)
+        votes[:n] = lsb_plane[:n]  # пиксели за пределами изображения считаются нулями, как в исходном цикле
+
+        bit_sums = votes.reshape(num_bits, block_size).sum(axis=1, dtype=np.int64)
+        threshold = block_size // 2
+        bits = (bit_sums > threshold).astype(np.uint8)
+        margins = np.where(bits == 1, bit_sums - threshold, threshold + 1 - bit_sums)
+        margins[n // block_size:] = 0
+        st.add(pixels=n, bits=num_bits)
+    return bits, margins
+
+
+# Извлекаем num_bits бит, закодированных повторением, из массива (H, W, 3)
+def extract_blocks_array(rgb, num_bits, block_size, channel=BLUE):
+    plane = rgb.reshape(-1, rgb.shape[-1])[:num_bits * block_size, channel] & 1
+    return majority_decode(plane, num_bits, block_size)
@@ -0,0 +1,130 @@
+import os
+import shutil
+import struct
+
+import numpy as np
+
+from lsb_engine import BLUE, bits_to_array
+from instrument import stage
+
+
+# Разбор заголовка несжатого 24-битного BMP без декодирования пикселей
+def read_bmp_header(path):
+    with open(path, 'rb') as f:
+        file_header = f.read(14)
+        if len(file_header) < 14 or file_header[:2] != b'BM':
+            raise ValueError(f"{path}: не BMP-файл")
+        pixel_offset = struct.unpack_from('<I', file_header, 10)[0]
+        dib_size = struct.unpack('<I', f.read(4))[0]
+        if dib_size == 12:  # BITMAPCOREHEADER
+            width, height, _, bit_count = struct.unpack('<hhHH', f.read(8))
+            compression = 0
+        else:
+            width, height, _, bit_count, compression = struct.unpack('<iiHHI', f.read(16))
+
+    if bit_count != 24 or compression != 0:
+        raise ValueError(f"{path}: поддерживаются только несжатые 24-битные BMP "
+                         f"(bit_count={bit_count}, compression={compression})")
+
+    return {
+        'width': width,
+        'height': abs(height),
+        'top_down': height < 0,  # отрицательная высота – строки хранятся сверху вниз
+        'offset': pixel_offset,
+        'row_stride': (width * 3 + 3) // 4 * 4,  # строки выровнены по 4 байта
+    }
+
+
+# Отображаем в память первые rows строк изображения (в порядке сверху вниз).
+# Возвращает (memmap, вид (rows, W, 3) в порядке BGR). Читаются/пишутся только эти строки файла.
+def map_bmp_rows(path, rows=None, mode='r', header=None):
+    header = header or read_bmp_header(path)
+    width, height, stride = header['width'], header['height'], header['row_stride']
+    rows = height if rows is None else min(rows, height)
+
+    # В bottom-up BMP верхние строки изображения лежат в конце массива пикселей
+    first_stored_row = 0 if header['top_down'] else height - rows
+    mm = np.memmap(path, dtype=np.uint8, mode=mode,
+                   offset=header['offset'] + first_stored_row * stride, shape=(rows, stride))
+    view = mm[:, :width * 3].reshape(rows, width, 3)
+    if not header['top_down']:
+        view = view[::-1]
+    return mm, view
+
+
+# Записываем биты в младшие биты первых строк двумерной плоскости канала (вид может быть несмежным)
+def write_plane_lsb(plane, bits):
+    width = plane.shape[1]
+    full_rows, rest = divmod(bits.size, width)
+    if full_rows:
+        plane[:full_rows] = (plane[:full_rows] & 0xFE) | bits[:full_rows * width].reshape(full_rows, width)
+    if rest:
+        plane[full_rows, :rest] = (plane[full_rows, :rest] & 0xFE) | bits[full_rows * width:]
+
+
+# Указывают ли два пути на один и тот же существующий файл
+def same_file(path, other):
+    return os.path.exists(path) and os.path.exists(other) and os.path.samefile(path, other)
+
+
+# Копия файла-контейнера; copy_file_range позволяет файловой системе разделить блоки (reflink) без копирования данных.
+# Если dst – тот же файл, что и src, копировать нечего: дальнейшая запись идёт в исходный файл на месте
+# (открытие dst на запись обнулило бы исходный файл до чтения).
+def clone_file(src, dst):
+    if same_file(src, dst):
+        return
+    if not hasattr(os, 'copy_file_range'):
+        shutil.copyfile(src, dst)
+        return
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        remaining = os.fstat(fin.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(fin.fileno(), fout.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            remaining = -1
+    if remaining != 0:
+        shutil.copyfile(src, dst)
+
+
+# Записываем биты в младшие биты синего канала BMP прямо в файле.
+# Без output_path (или если это тот же файл) файл изменяется на месте, иначе изменяется его копия.
+# Затрагиваются только строки, в которые попадает нагрузка. Возвращает число записанных бит.
+def embed_bits_bmp(path, data_bits, output_path=None, channel=BLUE):
+    if output_path is not None:
+        clone_file(path, output_path)
+        path = output_path
+
+    header = read_bmp_header(path)
+    width = header['width']
+    bits = bits_to_array(data_bits)
+    n = min(bits.size, width * header['height'])
+    if n == 0:
+        return 0
+
+    rows = -(-n // width)
+    with stage('embed') as st:
+        mm, view = map_bmp_rows(path, rows, mode='r+', header=header)
+        write_plane_lsb(view[..., 2 - channel], bits[:n])  # в BMP каналы хранятся в порядке BGR
+        mm.flush()
+        del mm, view
+        st.add(pixels=n, bits=n, bytes_written=rows * header['row_stride'])
+    return n
+
+
+# Читаем num_bits младших битов синего канала, отображая только нужные строки
+def extract_bits_bmp(path, num_bits, channel=BLUE):
+    header = read_bmp_header(path)
+    width = header['width']
+    num_bits = min(num_bits, width * header['height'])
+    if num_bits <= 0:
+        return np.zeros(0, dtype=np.uint8)
+    rows = -(-num_bits // width)
+    with stage('extract') as st:
+        _, view = map_bmp_rows(path, rows, mode='r', header=header)
+        bits = view[..., 2 - channel].reshape(-1)[:num_bits] & 1
+        st.add(pixels=num_bits, bits=num_bits, bytes_read=rows * header['row_stride'])
+    return bits
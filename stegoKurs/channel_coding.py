@@ -0,0 +1,384 @@
+import argparse
+import time
+
+import numpy as np
+
+from payload import PackedBits, as_packed
+from lsb_engine import DEFAULT_LAYOUT, bits_to_array, embed_layout_array, extract_layout_array
+from block_codec import majority_decode
+
+
+# Базовый класс кодеков канала. Наследники реализуют encode_bits/decode_bits над массивами
+# нулей/единиц; encode/decode работают с упакованной нагрузкой (PackedBits).
+class Codec:
+    name = 'none'
+
+    # Длина закодированной последовательности в битах для num_bits бит нагрузки
+    def coded_length(self, num_bits):
+        return num_bits
+
+    def encode_bits(self, bits):
+        return bits
+
+    # Возвращает (биты, число исправленных ошибок, число нераскодированных блоков)
+    def decode_bits(self, coded, num_bits):
+        return coded[:num_bits], 0, 0
+
+    def encode(self, payload):
+        return PackedBits.from_array(self.encode_bits(bits_to_array(as_packed(payload))))
+
+    def decode(self, coded, num_bits):
+        bits, _, _ = self.decode_bits(bits_to_array(as_packed(coded)), num_bits)
+        return PackedBits.from_array(bits)
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+# Кодирование повторением с мажоритарным декодированием (схема testBLOCKS.py)
+class RepetitionCodec(Codec):
+    name = 'repetition'
+
+    def __init__(self, block_size=230):
+        self.block_size = block_size
+
+    def coded_length(self, num_bits):
+        return num_bits * self.block_size
+
+    def encode_bits(self, bits):
+        return np.repeat(bits, self.block_size)
+
+    def decode_bits(self, coded, num_bits):
+        bits, margins = majority_decode(coded, num_bits, self.block_size)
+        # Ошибочные голоса в блоке – сколько пикселей не совпало с решением; для полных блоков
+        # выводятся из запаса голосов (запас = голоса за решение - порог). У обрезанных блоков
+        # запас равен 0, поэтому их прочитанные голоса сравниваются с решением напрямую.
+        threshold = self.block_size // 2
+        full = min(coded.size, num_bits * self.block_size) // self.block_size
+        wrong = np.where(bits[:full] == 1, self.block_size - threshold - margins[:full],
+                         threshold + 1 - margins[:full])
+        tail = coded[full * self.block_size:num_bits * self.block_size]
+        truncated = np.count_nonzero(tail != np.repeat(bits[full:], self.block_size)[:tail.size])
+        return bits, int(wrong.sum()) + truncated, 0
+
+    def __repr__(self):
+        return f"RepetitionCodec(block_size={self.block_size})"
+
+
+# Код Хэмминга (7,4): исправляет одну ошибку в каждом блоке из 7 бит.
+# Биты блока расположены как p1 p2 d1 p3 d2 d3 d4, поэтому синдром равен номеру ошибочной позиции.
+class HammingCodec(Codec):
+    name = 'hamming74'
+    _DATA_POS = np.array([2, 4, 5, 6])
+    _PARITY_POS = np.array([0, 1, 3])
+    # Столбцы проверочной матрицы – двоичные записи номеров позиций 1..7
+    _H = ((np.arange(1, 8)[None, :] >> np.arange(3)[:, None]) & 1).astype(np.uint8)
+
+    def coded_length(self, num_bits):
+        return -(-num_bits // 4) * 7
+
+    def encode_bits(self, bits):
+        data = np.zeros(-(-bits.size // 4) * 4, dtype=np.uint8)
+        data[:bits.size] = bits
+        data = data.reshape(-1, 4)
+        blocks = np.zeros((data.shape[0], 7), dtype=np.uint8)
+        blocks[:, self._DATA_POS] = data
+        # Чётность выбирается так, чтобы синдром безошибочного блока был нулевым
+        blocks[:, self._PARITY_POS] = (blocks @ self._H.T) & 1
+        return blocks.ravel()
+
+    def decode_bits(self, coded, num_bits):
+        blocks = coded[:self.coded_length(num_bits)].reshape(-1, 7).copy()
+        syndrome = ((blocks @ self._H.T) & 1) @ np.array([1, 2, 4])
+        rows = np.nonzero(syndrome)[0]
+        blocks[rows, syndrome[rows] - 1] ^= 1
+        return blocks[:, self._DATA_POS].ravel()[:num_bits], int(rows.size), 0
+
+
+# Арифметика поля GF(2^8) с порождающим многочленом x^8 + x^4 + x^3 + x^2 + 1 (0x11d)
+_GF_EXP = np.zeros(512, dtype=np.int64)
+_GF_LOG = np.zeros(256, dtype=np.int64)
+_x = 1
+for _i in range(255):
+    _GF_EXP[_i] = _x
+    _GF_LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11d
+_GF_EXP[255:510] = _GF_EXP[:255]
+
+
+def _gf_mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return int(_GF_EXP[_GF_LOG[a] + _GF_LOG[b]])
+
+
+# Векторное умножение массивов элементов поля
+def _gf_mul_array(a, b):
+    product = _GF_EXP[(_GF_LOG[a] + _GF_LOG[b]) % 255]
+    return np.where((a == 0) | (b == 0), 0, product)
+
+
+def _gf_pow(x, power):
+    return int(_GF_EXP[(_GF_LOG[x] * power) % 255])
+
+
+def _gf_inverse(x):
+    return int(_GF_EXP[255 - _GF_LOG[x]])
+
+
+def _poly_scale(p, x):
+    return [_gf_mul(c, x) for c in p]
+
+
+def _poly_add(p, q):
+    r = [0] * max(len(p), len(q))
+    for i, c in enumerate(p):
+        r[i + len(r) - len(p)] = c
+    for i, c in enumerate(q):
+        r[i + len(r) - len(q)] ^= c
+    return r
+
+
+def _poly_mul(p, q):
+    r = [0] * (len(p) + len(q) - 1)
+    for j, b in enumerate(q):
+        for i, a in enumerate(p):
+            r[i + j] ^= _gf_mul(a, b)
+    return r
+
+
+def _poly_eval(p, x):
+    y = p[0]
+    for c in p[1:]:
+        y = _gf_mul(y, x) ^ c
+    return y
+
+
+# Код Рида–Соломона RS(n, n - nsym) над байтами: исправляет до nsym/2 ошибочных байт в блоке.
+# Кодирование и вычисление синдромов векторизованы по всем блокам сразу; алгоритм
+# Берлекэмпа–Мэсси и формула Форни выполняются только для блоков с ненулевым синдромом.
+class ReedSolomonCodec(Codec):
+    name = 'rs'
+
+    def __init__(self, nsym=16, n=255):
+        if not 0 < nsym < n <= 255:
+            raise ValueError(f"Недопустимые параметры RS: n={n}, nsym={nsym}")
+        self.nsym = nsym
+        self.n = n
+        self.k = n - nsym
+        generator = [1]
+        for i in range(nsym):
+            generator = _poly_mul(generator, [1, _gf_pow(2, i)])
+        self._generator = np.array(generator[1:], dtype=np.int64)
+
+    def _num_blocks(self, num_bits):
+        num_bytes = -(-num_bits // 8)
+        return max(1, -(-num_bytes // self.k))
+
+    def coded_length(self, num_bits):
+        return self._num_blocks(num_bits) * self.n * 8
+
+    def encode_bits(self, bits):
+        message = np.zeros(self._num_blocks(bits.size) * self.k, dtype=np.int64)
+        data = np.packbits(bits)
+        message[:data.size] = data
+        message = message.reshape(-1, self.k)
+
+        # Систематическое кодирование: остаток от деления m(x) * x^nsym на g(x), регистр сдвига по всем блокам
+        remainder = np.zeros((message.shape[0], self.nsym), dtype=np.int64)
+        for i in range(self.k):
+            feedback = message[:, i] ^ remainder[:, 0]
+            remainder[:, :-1] = remainder[:, 1:]
+            remainder[:, -1] = 0
+            remainder ^= _gf_mul_array(feedback[:, None], self._generator[None, :])
+        blocks = np.concatenate((message, remainder), axis=1).astype(np.uint8)
+        return np.unpackbits(blocks.ravel())
+
+    # Синдромы S_j = c(α^j), j = 0..nsym-1, для всех блоков схемой Горнера
+    def _syndromes(self, blocks):
+        roots = _GF_EXP[np.arange(self.nsym)][None, :]
+        synd = np.zeros((blocks.shape[0], self.nsym), dtype=np.int64)
+        for i in range(self.n):
+            synd = _gf_mul_array(synd, roots) ^ blocks[:, i:i + 1]
+        return synd
+
+    # Исправление одного блока; None, если ошибок больше, чем может исправить код
+    def _correct_block(self, block, synd):
+        synd = [0] + [int(s) for s in synd]
+        err_loc, old_loc = [1], [1]
+        for i in range(self.nsym):
+            delta = synd[i + 1]
+            for j in range(1, len(err_loc)):
+                delta ^= _gf_mul(err_loc[-(j + 1)], synd[i + 1 - j])
+            old_loc = old_loc + [0]
+            if delta != 0:
+                if len(old_loc) > len(err_loc):
+                    new_loc = _poly_scale(old_loc, delta)
+                    old_loc = _poly_scale(err_loc, _gf_inverse(delta))
+                    err_loc = new_loc
+                err_loc = _poly_add(err_loc, _poly_scale(old_loc, delta))
+        while err_loc and err_loc[0] == 0:
+            err_loc = err_loc[1:]
+        errs = len(err_loc) - 1
+        if errs * 2 > self.nsym:
+            return None
+
+        # Поиск Ченя: корни локатора ищутся сразу по всем позициям блока
+        reversed_loc = err_loc[::-1]
+        points = _GF_EXP[np.arange(self.n)]
+        values = np.full(self.n, reversed_loc[0], dtype=np.int64)
+        for c in reversed_loc[1:]:
+            values = _gf_mul_array(values, points) ^ c
+        err_pos = [self.n - 1 - i for i in np.nonzero(values == 0)[0]]
+        if len(err_pos) != errs:
+            return None
+
+        # Формула Форни: величины ошибок
+        coef_pos = [self.n - 1 - p for p in err_pos]
+        loc = [1]
+        for p in coef_pos:
+            loc = _poly_mul(loc, [_gf_pow(2, p), 1])
+        product = _poly_mul(synd[::-1], loc)
+        evaluator = product[len(product) - len(loc):]  # остаток от деления на x^(число ошибок + 1)
+        xs = [_gf_pow(2, p) for p in coef_pos]
+        corrected = block.copy()
+        for i, x in enumerate(xs):
+            x_inv = _gf_inverse(x)
+            loc_prime = 1
+            for j, xj in enumerate(xs):
+                if j != i:
+                    loc_prime = _gf_mul(loc_prime, 1 ^ _gf_mul(x_inv, xj))
+            y = _gf_mul(x, _poly_eval(evaluator, x_inv))
+            corrected[err_pos[i]] ^= _gf_mul(y, _gf_inverse(loc_prime))
+        return corrected
+
+    def decode_bits(self, coded, num_bits):
+        blocks = np.packbits(coded[:self.coded_length(num_bits)]).astype(np.int64).reshape(-1, self.n)
+        synd = self._syndromes(blocks)
+        corrected, failed = 0, 0
+        for row in np.nonzero(synd.any(axis=1))[0]:
+            fixed = self._correct_block(blocks[row], synd[row])
+            if fixed is None or self._syndromes(fixed[None, :]).any():
+                failed += 1
+                continue
+            corrected += int(np.count_nonzero(fixed != blocks[row]))
+            blocks[row] = fixed
+        data = blocks[:, :self.k].astype(np.uint8).ravel()
+        return np.unpackbits(data)[:num_bits], corrected, failed
+
+    def __repr__(self):
+        return f"ReedSolomonCodec(nsym={self.nsym}, n={self.n})"
+
+
+# Блочное перемежение поверх любого кодека: пачка соседних ошибок (например, испорченный
+# участок изображения) распределяется по разным кодовым блокам
+class InterleavedCodec(Codec):
+    def __init__(self, codec, depth=8):
+        self.codec = codec
+        self.depth = depth
+        self.name = f"{codec.name}+interleave{depth}"
+
+    def coded_length(self, num_bits):
+        return -(-self.codec.coded_length(num_bits) // self.depth) * self.depth
+
+    def encode_bits(self, bits):
+        coded = self.codec.encode_bits(bits)
+        padded = np.zeros(self.coded_length(bits.size), dtype=np.uint8)
+        padded[:coded.size] = coded
+        return padded.reshape(-1, self.depth).T.ravel()
+
+    def decode_bits(self, coded, num_bits):
+        length = self.coded_length(num_bits)
+        deinterleaved = coded[:length].reshape(self.depth, -1).T.ravel()
+        return self.codec.decode_bits(deinterleaved, num_bits)
+
+    def __repr__(self):
+        return f"InterleavedCodec({self.codec!r}, depth={self.depth})"
+
+
+CODECS = {
+    'none': Codec,
+    'repetition': RepetitionCodec,
+    'hamming74': HammingCodec,
+    'rs': ReedSolomonCodec,
+}
+
+
+# Кодек по имени; interleave > 1 добавляет перемежение
+def get_codec(name, interleave=1, **params):
+    codec = CODECS[name](**params)
+    return InterleavedCodec(codec, interleave) if interleave > 1 else codec
+
+
+# Проверка, что кодовое слово для num_bits бит нагрузки помещается в контейнер
+def _check_capacity(rgb, num_bits, codec, layout):
+    capacity = layout.capacity(rgb.shape[1], rgb.shape[0])
+    coded_length = codec.coded_length(num_bits)
+    if coded_length > capacity:
+        raise ValueError(f"Нагрузка {num_bits} бит после кодирования {codec!r} занимает {coded_length} бит "
+                         f"и не помещается в контейнер ({capacity} бит)")
+    return coded_length
+
+
+# Встраивание нагрузки, защищённой кодеком, по схеме layout; возвращает число бит канала
+def embed_coded_array(rgb, payload, codec, layout=DEFAULT_LAYOUT):
+    bits = bits_to_array(as_packed(payload))
+    _check_capacity(rgb, bits.size, codec, layout)
+    return embed_layout_array(rgb, codec.encode_bits(bits), layout)
+
+
+# Извлечение и декодирование num_bits бит нагрузки
+def extract_coded_array(rgb, num_bits, codec, layout=DEFAULT_LAYOUT):
+    coded = extract_layout_array(rgb, _check_capacity(rgb, num_bits, codec, layout), layout)
+    bits, _, _ = codec.decode_bits(coded, num_bits)
+    return PackedBits.from_array(bits)
+
+
+# Моделирование канала: случайная инверсия младших битов с вероятностью error_rate.
+# Возвращает для каждой вероятности долю ошибочных бит после декодирования и скорость кодека.
+def simulate(codec, num_bits=10000, error_rates=(0.001, 0.01, 0.05, 0.1), trials=5, seed=0):
+    rng = np.random.default_rng(seed)
+    results = []
+    for rate in error_rates:
+        errors, encode_time, decode_time, failed = 0, 0.0, 0.0, 0
+        for _ in range(trials):
+            bits = rng.integers(0, 2, num_bits, dtype=np.uint8)
+            start = time.perf_counter()
+            coded = codec.encode_bits(bits)
+            encode_time += time.perf_counter() - start
+
+            noisy = coded ^ (rng.random(coded.size) < rate).astype(np.uint8)
+            start = time.perf_counter()
+            decoded, _, block_failures = codec.decode_bits(noisy, num_bits)
+            decode_time += time.perf_counter() - start
+            errors += int(np.count_nonzero(decoded != bits))
+            failed += block_failures
+        results.append({
+            'codec': repr(codec),
+            'error_rate': rate,
+            'coded_bits': codec.coded_length(num_bits),
+            'overhead': codec.coded_length(num_bits) / num_bits,
+            'bit_error_rate': errors / (num_bits * trials),
+            'failed_blocks': failed,
+            'encode_mbit_per_s': num_bits * trials / encode_time / 1e6 if encode_time else float('inf'),
+            'decode_mbit_per_s': num_bits * trials / decode_time / 1e6 if decode_time else float('inf'),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Моделирование помехоустойчивости кодеков канала")
+    parser.add_argument('--bits', type=int, default=10000)
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--rates', type=float, nargs='+', default=[0.001, 0.01, 0.05, 0.1])
+    args = parser.parse_args()
+
+    codecs = [RepetitionCodec(230), RepetitionCodec(15), HammingCodec(),
+              ReedSolomonCodec(32), InterleavedCodec(HammingCodec(), 7)]
+    for codec in codecs:
+        for r in simulate(codec, args.bits, args.rates, args.trials):
+            print(f"{r['codec']:<45} p={r['error_rate']:<6} x{r['overhead']:<7.2f} "
+                  f"BER={r['bit_error_rate']:.2e} сбоев блоков={r['failed_blocks']:<4} "
+                  f"кодирование {r['encode_mbit_per_s']:.1f} Мбит/с, декодирование {r['decode_mbit_per_s']:.1f} Мбит/с")
@@ -0,0 +1,206 @@
+import argparse
+import struct
+
+import numpy as np
+
+from lsb_engine import BLUE
+from metrics import CHANNEL_NAMES, as_rgb_array
+
+
+# Двоичный дамп одного канала изображения вместо текстовых файлов matrix.py:
+#   заголовок – magic 'KCHD', версия, номер канала, высота, ширина, размер блока;
+#   далее значения канала подряд (uint8, по строкам), выровненные по DATA_OFFSET.
+# Файл отображается в память, любой блок читается без разбора остальных.
+DUMP_MAGIC = b'KCHD'
+DUMP_VERSION = 1
+DUMP_HEADER = struct.Struct('<4sBBHIII')
+DATA_OFFSET = 32
+DEFAULT_BLOCK_SIZE = 230  # как в matrix.py и testBLOCKS.py
+NO_CHANNEL = 255  # дамп не из RGB-изображения (например, сконвертированный текстовый)
+
+
+# Сохранение канала в двоичный дамп. image – путь, PIL.Image, массив (H, W, 3)
+# или уже выделенный канал (H, W).
+def write_channel_dump(path, image, channel=BLUE, block_size=DEFAULT_BLOCK_SIZE):
+    if isinstance(image, np.ndarray) and image.ndim == 2:
+        plane = image
+    else:
+        plane = as_rgb_array(image)[..., channel]
+    if plane.dtype != np.uint8:
+        raise ValueError("Значения канала должны быть uint8")
+    if block_size <= 0:
+        raise ValueError("Размер блока должен быть положительным")
+    height, width = plane.shape
+    header = DUMP_HEADER.pack(DUMP_MAGIC, DUMP_VERSION, channel, 0, height, width, block_size)
+    with open(path, 'wb') as f:
+        f.write(header.ljust(DATA_OFFSET, b'\0'))
+        np.ascontiguousarray(plane).tofile(f)
+    return ChannelDump(path)
+
+
+# Двоичный дамп, отображённый в память (только чтение)
+class ChannelDump:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            raw = f.read(DUMP_HEADER.size)
+        if len(raw) < DUMP_HEADER.size or raw[:4] != DUMP_MAGIC:
+            raise ValueError(f"{path}: это не двоичный дамп канала")
+        magic, version, self.channel, _, self.height, self.width, self.block_size = DUMP_HEADER.unpack(raw)
+        if version != DUMP_VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия дампа {version}")
+        self.values = np.memmap(path, dtype=np.uint8, mode='r', offset=DATA_OFFSET,
+                                shape=(self.height * self.width,))
+
+    # Число полных блоков; хвост короче блока в блоки не входит, как в matrix.py
+    @property
+    def num_blocks(self):
+        return self.values.size // self.block_size
+
+    # Канал как массив (H, W)
+    @property
+    def plane(self):
+        return self.values.reshape(self.height, self.width)
+
+    # Блоки [start, stop) как массив (k, block_size) – вид на файл без копирования
+    def blocks(self, start=0, stop=None):
+        stop = self.num_blocks if stop is None else min(stop, self.num_blocks)
+        return self.values[start * self.block_size:stop * self.block_size].reshape(-1, self.block_size)
+
+    def block(self, index):
+        if not -self.num_blocks <= index < self.num_blocks:
+            raise IndexError(f"Блок {index} вне диапазона (всего {self.num_blocks})")
+        return self.blocks(index % self.num_blocks, index % self.num_blocks + 1)[0]
+
+    def __len__(self):
+        return self.num_blocks
+
+    def __getitem__(self, index):
+        return self.block(index)
+
+    def __repr__(self):
+        channel = CHANNEL_NAMES[self.channel] if self.channel < len(CHANNEL_NAMES) else '-'
+        return (f"ChannelDump({self.path!r}, {self.width}x{self.height}, канал {channel}, "
+                f"{self.num_blocks} блоков по {self.block_size})")
+
+
+# Чтение старого текстового дампа (по блоку в строке, значения через пробел).
+# Возвращает (значения uint8, размер блока = число значений в первой строке, число строк).
+def read_text_dump(path):
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    lines = text.split('\n', 1)
+    block_size = len(lines[0].split())
+    values = np.array(text.split(), dtype=np.uint8)
+    return values, block_size, text.count('\n') + (not text.endswith('\n') and bool(text))
+
+
+# Конвертация текстового дампа в двоичный. shape – (высота, ширина) исходного канала;
+# по умолчанию строка файла считается строкой изображения.
+def convert_text_dump(text_path, dump_path, shape=None, channel=NO_CHANNEL):
+    values, block_size, lines = read_text_dump(text_path)
+    height, width = shape or (lines, values.size // max(lines, 1))
+    if height * width != values.size:
+        raise ValueError(f"В {text_path} {values.size} значений, а не {height}x{width}")
+    return write_channel_dump(dump_path, values.reshape(height, width), channel, block_size)
+
+
+def _open(dump):
+    return dump if isinstance(dump, ChannelDump) else ChannelDump(dump)
+
+
+# Сравнение исходного и стего-дампов целиком векторными операциями.
+# Возвращает позиции изменённых значений и по каждому полному блоку: число изменённых значений,
+# число перевёрнутых младших битов и число единиц в младших битах до и после встраивания.
+def diff_dumps(original, stego):
+    original, stego = _open(original), _open(stego)
+    if (original.height, original.width) != (stego.height, stego.width):
+        raise ValueError("Дампы должны иметь одинаковые размеры!")
+    block_size = stego.block_size
+    a, b = original.values, stego.values
+
+    changed = a != b
+    positions = np.flatnonzero(changed)
+    flips = ((a ^ b) & 1).astype(bool)
+    full = stego.num_blocks * block_size
+
+    per_block = {
+        'changed': changed[:full].reshape(-1, block_size).sum(axis=1),
+        'lsb_flips': flips[:full].reshape(-1, block_size).sum(axis=1),
+        'lsb_ones_original': (a[:full] & 1).reshape(-1, block_size).sum(axis=1, dtype=np.int64),
+        'lsb_ones_stego': (b[:full] & 1).reshape(-1, block_size).sum(axis=1, dtype=np.int64),
+    }
+    return {
+        'positions': positions,
+        'changed': int(positions.size),
+        'lsb_flips': int(np.count_nonzero(flips)),
+        'max_abs_diff': int(np.abs(a.astype(np.int16) - b).max()) if a.size else 0,
+        'total': int(a.size),
+        'block_size': block_size,
+        'per_block': per_block,
+    }
+
+
+# Краткий текстовый отчёт по результату diff_dumps
+def format_diff(diff, width=None, top=10):
+    per_block = diff['per_block']
+    lines = [f"Изменено {diff['changed']} из {diff['total']} значений, перевёрнуто младших битов: "
+             f"{diff['lsb_flips']}, максимальное отличие: {diff['max_abs_diff']}",
+             f"Блоков по {diff['block_size']}: {per_block['changed'].size}, "
+             f"с изменениями: {int(np.count_nonzero(per_block['changed']))}"]
+    for index in np.argsort(per_block['lsb_flips'])[::-1][:top]:
+        if per_block['lsb_flips'][index] == 0:
+            break
+        lines.append(f"  блок {index}: изменено {per_block['changed'][index]}, "
+                     f"перевёрнуто МЗБ {per_block['lsb_flips'][index]}, единиц МЗБ "
+                     f"{per_block['lsb_ones_original'][index]} -> {per_block['lsb_ones_stego'][index]}")
+    if width and diff['changed']:
+        y, x = divmod(diff['positions'][:top], width)
+        lines.append("Первые изменённые позиции (y, x): " + ', '.join(f"({a}, {b})" for a, b in zip(y, x)))
+    return '\n'.join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Двоичные дампы канала изображения")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    dump = commands.add_parser('dump', help="изображение -> двоичный дамп канала")
+    dump.add_argument('image')
+    dump.add_argument('output')
+    dump.add_argument('--channel', type=int, default=BLUE)
+    dump.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE)
+
+    convert = commands.add_parser('convert', help="текстовый дамп -> двоичный")
+    convert.add_argument('text')
+    convert.add_argument('output')
+    convert.add_argument('--shape', type=int, nargs=2, metavar=('HEIGHT', 'WIDTH'))
+    convert.add_argument('--channel', type=int, default=NO_CHANNEL)
+
+    show = commands.add_parser('show', help="заголовок дампа и значения блока")
+    show.add_argument('dump')
+    show.add_argument('--block', type=int, default=0)
+
+    diff = commands.add_parser('diff', help="сравнение исходного и стего-дампов")
+    diff.add_argument('original')
+    diff.add_argument('stego')
+    diff.add_argument('--top', type=int, default=10)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'dump':
+        print(write_channel_dump(args.output, args.image, args.channel, args.block_size))
+    elif args.command == 'convert':
+        print(convert_text_dump(args.text, args.output, args.shape, args.channel))
+    elif args.command == 'show':
+        dump = ChannelDump(args.dump)
+        print(dump)
+        print(' '.join(map(str, dump.block(args.block))))
+    else:
+        stego = ChannelDump(args.stego)
+        print(format_diff(diff_dumps(args.original, stego), stego.width, args.top))
+
+
+if __name__ == '__main__':
+    main()
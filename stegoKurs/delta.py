@@ -0,0 +1,138 @@
+import argparse
+
+import numpy as np
+
+from payload import as_packed
+from qr_gen import qr_payload_cache
+from lsb_engine import (DEFAULT_LAYOUT, EmbeddingLayout, bits_to_array, extract_layout_array, load_rgb_array,
+                        save_rgb_array, pixels_touched, slot_positions)
+from block_codec import repeat_bits
+from bmp_mmap import read_bmp_header, map_bmp_rows, clone_file
+from stego_header import HEADER_LAYOUT, HEADER_PIXELS, build_header, read_header
+from instrument import stage
+
+
+# Запись битов в слоты массива (H, W, 3) на месте (годится и для несмежного вида на файл).
+# Пиксели области начинаются с номера offset. Возвращает номера затронутых пикселей.
+def _write_slots(rgb, slots, bits, num_pixels, layout, offset=0):
+    pixel, channel, plane = slot_positions(slots, num_pixels, layout)
+    y, x = np.divmod(pixel + offset, rgb.shape[1])
+    for j in np.unique(plane):
+        sel = plane == j
+        index = (y[sel], x[sel], channel[sel])
+        rgb[index] = (rgb[index] & np.uint8(0xFF ^ (1 << j))) | (bits[sel] << j).astype(np.uint8)
+    return np.unique(pixel)
+
+
+# Сравнение слотов области с новыми значениями и запись только отличающихся.
+# Возвращает (число изменённых слотов, число изменённых пикселей).
+def _patch_region(rgb, offset, num_pixels, new_slots, layout):
+    pixels = np.ascontiguousarray(rgb).reshape(-1, rgb.shape[-1])[offset:]
+    old_slots = extract_layout_array(pixels, new_slots.size, layout)
+    changed = np.flatnonzero(old_slots != new_slots)
+    touched = _write_slots(rgb, changed, new_slots[changed], num_pixels, layout, offset)
+    return changed.size, touched.size
+
+
+def _delta(rgb, payload, layout, block_size, header, num_pixels):
+    payload = as_packed(payload)
+    report = {'payload_bits': payload.length, 'changed_bits': 0, 'changed_pixels': 0}
+    offset = 0
+    if header:
+        info = read_header(rgb)
+        layout, block_size = info['layout'], info['block_size']
+        offset = HEADER_PIXELS
+        capacity = layout.capacity(num_pixels - offset, 1) // block_size
+        if payload.length > capacity:
+            raise ValueError(f"Нагрузка {payload.length} бит не помещается в контейнер ({capacity} бит)")
+        header_bits = np.unpackbits(np.frombuffer(build_header(payload, layout, block_size), dtype=np.uint8))
+        bits, pixels = _patch_region(rgb, 0, HEADER_PIXELS, header_bits, HEADER_LAYOUT)
+        report['changed_bits'] += bits
+        report['changed_pixels'] += pixels
+
+    slots = repeat_bits(payload, block_size) if block_size > 1 else bits_to_array(payload)
+    slots = slots[:layout.capacity(num_pixels - offset, 1)]
+    with stage('embed') as st:
+        bits, pixels = _patch_region(rgb, offset, num_pixels - offset, slots, layout)
+        st.add(pixels=pixels, bits=bits)
+    report['changed_bits'] += bits
+    report['changed_pixels'] += pixels
+    report.update(layout=layout, block_size=block_size)
+    return report
+
+
+# Дельта-обновление стего-массива (H, W, 3) на месте: новая нагрузка сравнивается с записанной
+# слот за слотом (с учётом повторения каждого бита block_size раз), переписываются только
+# отличающиеся слоты. Результат совпадает с полным встраиванием в тот же стего-массив.
+# header=True – изображение с заголовком stego_header: схема и кратность берутся из заголовка,
+# длина и CRC в заголовке обновляются. Возвращает отчёт с числом изменённых бит и пикселей.
+def delta_embed_array(rgb, payload, layout=DEFAULT_LAYOUT, block_size=1, header=False):
+    return _delta(rgb, payload, layout, block_size, header, rgb.shape[0] * rgb.shape[1])
+
+
+# Число первых пикселей, которые может затронуть обновление
+def _pixels_needed(path, payload, layout, block_size, header, num_pixels):
+    if header:
+        info = read_header(path)
+        slots = as_packed(payload).length * info['block_size']
+        return HEADER_PIXELS + pixels_touched(slots, num_pixels - HEADER_PIXELS, info['layout'])
+    return pixels_touched(len(payload) * block_size, num_pixels, layout)
+
+
+# Дельта-обновление файла. Несжатый 24-битный BMP правится на месте через отображение в память
+# (с output_path – его копия), причём отображаются только строки с нагрузкой; остальные форматы
+# декодируются, исправляются и сохраняются заново.
+def delta_update(path, payload, output_path=None, layout=DEFAULT_LAYOUT, block_size=1, header=False):
+    payload = as_packed(payload)
+    try:
+        bmp_header = read_bmp_header(path)
+    except ValueError:
+        bmp_header = None
+
+    if bmp_header is None:
+        rgb = load_rgb_array(path)
+        report = delta_embed_array(rgb, payload, layout, block_size, header)
+        if report['changed_pixels'] or output_path is not None:
+            save_rgb_array(rgb, output_path or path)
+        report['in_place'] = False
+        return report
+
+    if output_path is not None:
+        clone_file(path, output_path)
+        path = output_path
+    width, height = bmp_header['width'], bmp_header['height']
+    needed = _pixels_needed(path, payload, layout, block_size, header, width * height)
+    mm, view = map_bmp_rows(path, -(-needed // width), mode='r+', header=bmp_header)
+    report = _delta(view[..., ::-1], payload, layout, block_size, header, width * height)  # BGR -> RGB
+    mm.flush()
+    del mm, view
+    report['in_place'] = True
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Обновление QR-кода в стего-изображении без полного встраивания")
+    parser.add_argument('stego', help="стего-изображение")
+    parser.add_argument('data', help="новые данные QR-кода")
+    parser.add_argument('--output', help="сохранить результат в другой файл (по умолчанию – на месте)")
+    parser.add_argument('--header', action='store_true', help="изображение с заголовком stego_header")
+    parser.add_argument('--qr-size', type=int, nargs=2, default=(100, 100))
+    parser.add_argument('--compact', action='store_true', help="встраивать матрицу модулей QR-кода")
+    parser.add_argument('--block-size', type=int, default=1)
+    parser.add_argument('--channels', type=int, nargs='+', default=[2])
+    parser.add_argument('--bits-per-channel', type=int, default=1)
+    parser.add_argument('--order', choices=EmbeddingLayout.ORDERS, default='pixel')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    payload = qr_payload_cache.get(args.data, None if args.compact else tuple(args.qr_size))
+    layout = EmbeddingLayout(args.channels, args.bits_per_channel, args.order)
+    report = delta_update(args.stego, payload, args.output, layout, args.block_size, args.header)
+    print(f"Изменено {report['changed_bits']} бит в {report['changed_pixels']} пикселях "
+          f"({'на месте' if report['in_place'] else 'с перекодированием файла'}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+
+
+# Счётчики этапа помимо числа вызовов и времени
+COUNTERS = ('bytes_read', 'bytes_written', 'pixels', 'bits')
+
+# Сбор статистики выключен по умолчанию; STEGO_INSTRUMENT=1 включает его при импорте
+# (в том числе в рабочих процессах, запущенных заново, а не через fork)
+_enabled = os.environ.get('STEGO_INSTRUMENT', '') not in ('', '0')
+_stats = {}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+# Сброс накопленной статистики
+def reset():
+    _stats.clear()
+
+
+def _entry(name):
+    entry = _stats.get(name)
+    if entry is None:
+        entry = _stats[name] = dict(calls=0, seconds=0.0, **dict.fromkeys(COUNTERS, 0))
+    return entry
+
+
+# Измерение одного выполнения этапа; счётчики добавляются через add()
+class _Stage:
+    __slots__ = ('name', 'counters', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+        self.start = 0.0
+
+    def add(self, **counters):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + int(value)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        entry = _entry(self.name)
+        entry['calls'] += 1
+        entry['seconds'] += time.perf_counter() - self.start
+        for key, value in self.counters.items():
+            entry[key] += value
+        return False
+
+
+# Заглушка при выключенном сборе: ничего не измеряет. Ложна в логическом контексте,
+# чтобы дорогие счётчики (например, размер файла) можно было не вычислять: `if st: st.add(...)`
+class _NullStage:
+    __slots__ = ()
+
+    def add(self, **counters):
+        pass
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+# Контекстный менеджер этапа: with stage('embed') as st: ...; st.add(pixels=..., bits=...)
+def stage(name):
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+# Декоратор: всё выполнение функции – этап name (по умолчанию имя функции)
+def timed(name=None):
+    def decorate(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Размер файла для счётчиков байт (0 для массивов, объектов PIL и несуществующих путей)
+def file_size(path):
+    if isinstance(path, (str, bytes, os.PathLike)):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    return 0
+
+
+# Копия накопленной статистики: {этап: {calls, seconds, bytes_read, bytes_written, pixels, bits}}
+def snapshot():
+    return {name: dict(entry) for name, entry in _stats.items()}
+
+
+# Статистика в формате JSON lines – по строке на этап; extra добавляется в каждую строку
+# (например, имя файла или номер задания). out – путь (дописывается) или открытый файл.
+def write_jsonl(out, stats=None, **extra):
+    stats = snapshot() if stats is None else stats
+    timestamp = time.time()
+    lines = [json.dumps(dict(extra, ts=timestamp, stage=name, **entry), ensure_ascii=False)
+             for name, entry in stats.items()]
+    if isinstance(out, (str, os.PathLike)):
+        with open(out, 'a', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in lines)
+    else:
+        out.writelines(line + '\n' for line in lines)
+
+
+# Профилирование одного участка (например, одного медленного задания) через cProfile.
+# С path результат сохраняется для pstats/snakeviz, иначе первые limit функций печатаются в stderr.
+@contextmanager
+def profile(path=None, sort='cumulative', limit=30):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path is not None:
+            profiler.dump_stats(path)
+        else:
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats(sort).print_stats(limit)
+            sys.stderr.write(text.getvalue())
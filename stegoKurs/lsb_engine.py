@@ -0,0 +1,181 @@
+import numpy as np
+from PIL import Image
+
+from payload import PackedBits
+from instrument import stage, file_size
+
+
+BLUE = 2  # индекс синего канала в массиве (H, W, 3)
+
+
+# Приводим нагрузку (PackedBits, строку или массив) к массиву uint8 из нулей и единиц
+def bits_to_array(data_bits):
+    if isinstance(data_bits, PackedBits):
+        return data_bits.unpack()
+    if isinstance(data_bits, np.ndarray):
+        return data_bits.astype(np.uint8, copy=False).ravel() & 1
+    return np.frombuffer(data_bits.encode('ascii'), dtype=np.uint8) - ord('0')
+
+
+# Загружаем контейнер как массив (H, W, 3) uint8
+def load_rgb_array(image_path):
+    with stage('load') as st:
+        rgb = np.array(Image.open(image_path).convert('RGB'), dtype=np.uint8)
+        if st:
+            st.add(bytes_read=file_size(image_path), pixels=rgb.shape[0] * rgb.shape[1])
+    return rgb
+
+
+# Сохранение массива (H, W, 3) в файл; формат определяется расширением
+def save_rgb_array(rgb, image_path):
+    with stage('save') as st:
+        Image.fromarray(rgb).save(image_path)
+        if st:
+            st.add(bytes_written=file_size(image_path), pixels=rgb.shape[0] * rgb.shape[1])
+
+
+# Записываем биты в младший бит синего канала массива (H, W, 3) по строкам, как в исходном попиксельном цикле.
+# Массив изменяется на месте, возвращается число реально записанных бит.
+def embed_bits_array(rgb, data_bits, channel=BLUE):
+    if not rgb.flags.c_contiguous:
+        raise ValueError("Массив контейнера должен быть непрерывным (C-contiguous)")
+    bits = bits_to_array(data_bits)
+    flat = rgb.reshape(-1, rgb.shape[-1])  # вид (view) на пиксели в порядке обхода y, x
+    n = min(bits.size, flat.shape[0])
+    with stage('embed') as st:
+        # Одна маскированная побитовая операция для всех затронутых пикселей
+        flat[:n, channel] = (flat[:n, channel] & 0xFE) | bits[:n]
+        st.add(pixels=n, bits=n)
+    return n
+
+
+# Читаем num_bits младших битов синего канала одним срезом
+def extract_bits_array(rgb, num_bits, channel=BLUE):
+    with stage('extract') as st:
+        bits = rgb.reshape(-1, rgb.shape[-1])[:num_bits, channel] & 1
+        st.add(pixels=bits.size, bits=bits.size)
+    return bits
+
+
+# Схема встраивания: какие каналы используются, сколько младших битовых плоскостей в каждом
+# и в каком порядке обходятся слоты (пиксель, канал, плоскость):
+#   'pixel'   – все слоты пикселя подряд, затем следующий пиксель (для (BLUE,), 1 – исходная схема);
+#   'channel' – весь первый канал по всем пикселям, затем следующий канал;
+#   'plane'   – младшая плоскость всех выбранных каналов, затем следующая плоскость.
+class EmbeddingLayout:
+    ORDERS = ('pixel', 'channel', 'plane')
+
+    def __init__(self, channels=(BLUE,), bits_per_channel=1, order='pixel'):
+        self.channels = tuple(int(c) for c in channels)
+        self.bits_per_channel = int(bits_per_channel)
+        self.order = order
+        if not self.channels or len(set(self.channels)) != len(self.channels) \
+                or any(c not in (0, 1, 2) for c in self.channels):
+            raise ValueError(f"Недопустимый список каналов: {channels}")
+        if not 1 <= self.bits_per_channel <= 8:
+            raise ValueError(f"bits_per_channel должно быть от 1 до 8, получено {bits_per_channel}")
+        if order not in self.ORDERS:
+            raise ValueError(f"Порядок обхода должен быть одним из {self.ORDERS}, получено {order!r}")
+
+    # Число бит нагрузки на один пиксель
+    @property
+    def bits_per_pixel(self):
+        return len(self.channels) * self.bits_per_channel
+
+    # Точная ёмкость контейнера width x height в битах нагрузки
+    def capacity(self, width, height):
+        return width * height * self.bits_per_pixel
+
+    def __eq__(self, other):
+        if not isinstance(other, EmbeddingLayout):
+            return NotImplemented
+        return (self.channels, self.bits_per_channel, self.order) == \
+            (other.channels, other.bits_per_channel, other.order)
+
+    def __hash__(self):
+        return hash((self.channels, self.bits_per_channel, self.order))
+
+    def __repr__(self):
+        return (f"EmbeddingLayout(channels={self.channels}, bits_per_channel={self.bits_per_channel}, "
+                f"order={self.order!r})")
+
+
+DEFAULT_LAYOUT = EmbeddingLayout()
+
+# Перестановка осей канонического тензора слотов (пиксель, канал, плоскость) для каждого порядка обхода
+_ORDER_AXES = {'pixel': (0, 1, 2), 'channel': (1, 0, 2), 'plane': (2, 0, 1)}
+
+
+# Сколько первых пикселей затрагивают n слотов: для порядков 'channel' и 'plane' нагрузка,
+# поместившаяся в первый канал/плоскость, занимает только начало изображения
+def pixels_touched(n, num_pixels, layout):
+    per_pixel_step = {'pixel': layout.bits_per_pixel,
+                      'channel': layout.bits_per_channel,
+                      'plane': len(layout.channels)}[layout.order]
+    if n <= num_pixels * per_pixel_step:
+        return -(-n // per_pixel_step)
+    return num_pixels
+
+
+# Битовые плоскости выбранных каналов первых P пикселей: тензор (P, C, k) из нулей и единиц
+def _slot_planes(values, layout):
+    shifts = np.arange(layout.bits_per_channel, dtype=np.uint8)
+    return (values[..., None] >> shifts) & 1
+
+
+# Номера слотов -> (пиксель, канал, битовая плоскость) для схемы layout.
+# num_pixels – число пикселей области; для номеров меньше ёмкости области соответствие
+# совпадает с тем, что даёт embed_layout_array при любой длине нагрузки.
+def slot_positions(slots, num_pixels, layout):
+    axes = _ORDER_AXES[layout.order]
+    dims = (num_pixels, len(layout.channels), layout.bits_per_channel)
+    coords = np.unravel_index(slots, tuple(dims[a] for a in axes))
+    pixel, channel, plane = (coords[axes.index(a)] for a in range(3))
+    return pixel, np.asarray(layout.channels)[channel], plane
+
+
+# Встраивание по схеме layout одной векторной операцией над битовыми плоскостями.
+# Массив изменяется на месте, возвращается число записанных бит.
+def embed_layout_array(rgb, data_bits, layout=DEFAULT_LAYOUT):
+    if layout.bits_per_pixel == 1:
+        return embed_bits_array(rgb, data_bits, layout.channels[0])
+    if not rgb.flags.c_contiguous:
+        raise ValueError("Массив контейнера должен быть непрерывным (C-contiguous)")
+
+    flat = rgb.reshape(-1, rgb.shape[-1])
+    bits = bits_to_array(data_bits)
+    n = min(bits.size, flat.shape[0] * layout.bits_per_pixel)
+    if n == 0:
+        return 0
+    pixels = pixels_touched(n, flat.shape[0], layout)
+    channels = list(layout.channels)
+
+    with stage('embed') as st:
+        values = flat[:pixels, channels]
+        axes = _ORDER_AXES[layout.order]
+        slots = _slot_planes(values, layout).transpose(axes).copy()
+        slots.reshape(-1)[:n] = bits[:n]
+        planes = slots.transpose(np.argsort(axes))
+
+        shifts = np.arange(layout.bits_per_channel, dtype=np.uint8)
+        low_bits = np.bitwise_or.reduce(planes << shifts, axis=-1).astype(np.uint8)
+        mask = np.uint8((1 << layout.bits_per_channel) - 1)
+        flat[:pixels, channels] = (values & ~mask) | low_bits
+        st.add(pixels=pixels, bits=n)
+    return n
+
+
+# Извлечение num_bits бит по схеме layout
+def extract_layout_array(rgb, num_bits, layout=DEFAULT_LAYOUT):
+    if layout.bits_per_pixel == 1:
+        return extract_bits_array(rgb, num_bits, layout.channels[0])
+
+    flat = rgb.reshape(-1, rgb.shape[-1])
+    n = min(num_bits, flat.shape[0] * layout.bits_per_pixel)
+    pixels = pixels_touched(n, flat.shape[0], layout)
+    with stage('extract') as st:
+        values = flat[:pixels, list(layout.channels)]
+        slots = _slot_planes(values, layout).transpose(_ORDER_AXES[layout.order])
+        bits = slots.reshape(-1)[:n]
+        st.add(pixels=pixels, bits=n)
+    return bits
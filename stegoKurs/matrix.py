@@ -1,6 +1,9 @@
 from PIL import Image
 import numpy as np
 
+from lsb_engine import BLUE
+from channel_dump import write_channel_dump
+
 # Загрузка изображения
 image = Image.open('stego_block.bmp')
 
@@ -21,17 +24,9 @@ block_size = 230
 num_blocks = (height * width) // block_size
 print(f"Количество блоков: {num_blocks}")
 
-# Преобразование синего канала в одномерный массив
-blue_channel_flat = blue_channel.flatten()
-
-# Разделение на блоки по 230 значений
-blocks = np.array_split(blue_channel_flat[:num_blocks * block_size], num_blocks)
-
-# Сохранение блоков в текстовый файл
-with open('blue_channel_blocks_stego.txt', 'w') as file:
-    for block in blocks:
-        # Преобразуем блок в строку с разделителем пробелом
-        block_str = ' '.join(map(str, block))
-        file.write(block_str + '\n')
+# Сохранение синего канала в двоичный дамп: заголовок (размер, блок, канал) и значения подряд.
+# Файл в ~4 раза меньше текстового и читается через отображение в память – любой блок
+# доступен без разбора остальных (channel_dump.ChannelDump, сравнение – channel_dump.py diff)
+dump = write_channel_dump('blue_channel_blocks_stego.kchd', blue_channel, BLUE, block_size)
 
-print("Блоки успешно сохранены в файл 'blue_channel_blocks_stego.txt'.")
\ No newline at end of file
+print(f"Блоки успешно сохранены в файл '{dump.path}'.")
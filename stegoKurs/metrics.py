@@ -0,0 +1,102 @@
+import numpy as np
+from PIL import Image
+
+from lsb_engine import load_rgb_array
+from streaming import DEFAULT_BAND_BYTES, iter_bmp_bands
+from bmp_mmap import read_bmp_header
+from instrument import stage
+
+
+CHANNEL_NAMES = ('R', 'G', 'B')
+DEFAULT_TILE_ROWS = 512  # строк на тайл: ограничивает размер временных целочисленных массивов
+MAX_VALUE = 255
+
+
+# Квадраты всех значений uint8 – суммы квадратов считаются по гистограммам значений
+_SQUARES = np.arange(256, dtype=np.int64) ** 2
+
+
+# Накопитель метрик: за один проход по паре изображений (или их тайлов) считает суммы
+# квадратов разностей, суммы квадратов исходника и число изменённых пикселей в int64.
+# Вся арифметика идёт в uint8: |a - b| = max - min, суммы квадратов – гистограмма @ квадраты.
+class MetricsAccumulator:
+    def __init__(self, channels=3):
+        self.sq_diff = np.zeros(channels, dtype=np.int64)
+        self.sq_orig = np.zeros(channels, dtype=np.int64)
+        self.changed_pixels = 0
+        self.pixel_count = 0
+
+    # a, b – массивы (..., C) uint8 одинаковой формы (a – исходное изображение)
+    def update(self, a, b):
+        a = a.reshape(-1, a.shape[-1])
+        b = b.reshape(a.shape)
+        diff = np.maximum(a, b)
+        diff -= np.minimum(a, b)
+        changed = np.zeros(a.shape[0], dtype=np.uint8)
+        for c in range(a.shape[-1]):
+            self.sq_diff[c] += np.bincount(diff[:, c], minlength=256) @ _SQUARES
+            self.sq_orig[c] += np.bincount(a[:, c], minlength=256) @ _SQUARES
+            changed |= diff[:, c]
+        self.changed_pixels += int(np.count_nonzero(changed))
+        self.pixel_count += a.shape[0]
+
+    def result(self):
+        mse = self.sq_diff / self.pixel_count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nmse = np.where(self.sq_orig > 0, self.sq_diff / np.maximum(self.sq_orig, 1), np.inf)
+            psnr = 10 * np.log10(MAX_VALUE ** 2 / mse)
+            total_mse = float(np.mean(mse))
+            total_psnr = float(10 * np.log10(MAX_VALUE ** 2 / total_mse)) if total_mse else float('inf')
+
+        return {
+            'mse': total_mse,  # среднее по каналам, как в calculate_mse
+            'nmse': float(np.mean(nmse)),  # среднее по каналам, как в calculate_nmse
+            'psnr': total_psnr,
+            'changed_pixels': self.changed_pixels,
+            'pixel_count': self.pixel_count,
+            'per_channel': {
+                name: {'mse': float(mse[i]), 'nmse': float(nmse[i]), 'psnr': float(psnr[i])}
+                for i, name in enumerate(CHANNEL_NAMES[:mse.size])
+            },
+        }
+
+
+# Изображение как массив (H, W, 3) uint8: принимается путь, PIL.Image или готовый массив
+def as_rgb_array(image):
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert('RGB'))
+    return load_rgb_array(image)
+
+
+# Все метрики за одно декодирование каждого изображения: MSE, NMSE, PSNR,
+# число изменённых пикселей и разбивка по каналам. Расчёт идёт тайлами по tile_rows строк.
+def compute_metrics(image1, image2, tile_rows=DEFAULT_TILE_ROWS):
+    img1, img2 = as_rgb_array(image1), as_rgb_array(image2)
+    if img1.shape != img2.shape:
+        raise ValueError("Изображения должны иметь одинаковые размеры!")
+
+    with stage('metrics') as st:
+        acc = MetricsAccumulator(img1.shape[-1])
+        for y0 in range(0, img1.shape[0], tile_rows):
+            acc.update(img1[y0:y0 + tile_rows], img2[y0:y0 + tile_rows])
+        st.add(pixels=img1.shape[0] * img1.shape[1])
+    return acc.result()
+
+
+# Потоковый вариант для больших BMP: изображения читаются полосами, в памяти не бывает целого изображения
+def stream_metrics(image1_path, image2_path, band_bytes=DEFAULT_BAND_BYTES):
+    header1, header2 = read_bmp_header(image1_path), read_bmp_header(image2_path)
+    if (header1['width'], header1['height']) != (header2['width'], header2['height']):
+        raise ValueError("Изображения должны иметь одинаковые размеры!")
+
+    with stage('metrics') as st:
+        acc = MetricsAccumulator()
+        bands1 = iter_bmp_bands(image1_path, band_bytes, header=header1)
+        bands2 = iter_bmp_bands(image2_path, band_bytes, header=header2)
+        for (_, a), (_, b) in zip(bands1, bands2):
+            acc.update(a[..., ::-1], b[..., ::-1])  # BGR -> RGB
+        st.add(pixels=header1['width'] * header1['height'],
+               bytes_read=2 * header1['height'] * header1['row_stride'])
+    return acc.result()
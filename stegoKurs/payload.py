@@ -0,0 +1,127 @@
+import numpy as np
+from PIL import Image
+
+from instrument import stage
+
+
+# Компактное представление полезной нагрузки: биты упакованы по 8 в байт (np.packbits),
+# хранится также точная длина в битах и исходный размер QR-кода (ширина, высота).
+class PackedBits:
+    def __init__(self, data, length, size=None):
+        self.data = np.asarray(data, dtype=np.uint8)
+        self.length = int(length)
+        self.size = tuple(size) if size is not None else None
+
+    # Из массива нулей/единиц
+    @classmethod
+    def from_array(cls, bit_array, size=None):
+        bit_array = np.asarray(bit_array, dtype=np.uint8).ravel()
+        return cls(np.packbits(bit_array), bit_array.size, size)
+
+    # Из строки '0'/'1' (совместимость со старым форматом)
+    @classmethod
+    def from_string(cls, bits, size=None):
+        bit_array = np.frombuffer(bits.encode('ascii'), dtype=np.uint8) - ord('0')
+        return cls.from_array(bit_array, size)
+
+    # Из черно-белого изображения (режим '1'): 0 – черный, 1 – белый, обход по строкам
+    @classmethod
+    def from_image(cls, img):
+        with stage('encode') as st:
+            pixels = np.array(img.convert('1'), dtype=bool)
+            packed = cls(np.packbits(pixels), pixels.size, img.size)
+            st.add(pixels=pixels.size, bits=pixels.size)
+        return packed
+
+    # Распаковка в массив uint8 из нулей и единиц длиной length
+    def unpack(self):
+        return np.unpackbits(self.data, count=self.length)
+
+    # Распаковка только битов [start, end) – без распаковки всей нагрузки
+    def unpack_range(self, start, end):
+        end = min(end, self.length)
+        if start >= end:
+            return np.zeros(0, dtype=np.uint8)
+        first_byte = start // 8
+        chunk = np.unpackbits(self.data[first_byte:(end + 7) // 8])
+        return chunk[start - first_byte * 8:end - first_byte * 8]
+
+    def to_string(self):
+        return (self.unpack() + ord('0')).tobytes().decode('ascii')
+
+    # Восстановление изображения режима '1'; недостающие пиксели остаются черными
+    def to_image(self, size=None):
+        width, height = size if size is not None else self.size
+        pixels = np.zeros(width * height, dtype=bool)
+        n = min(self.length, pixels.size)
+        pixels[:n] = self.unpack()[:n]
+        return Image.fromarray(pixels.reshape(height, width))
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            other = PackedBits.from_string(other)
+        if not isinstance(other, PackedBits):
+            return NotImplemented
+        return self.length == other.length and np.array_equal(self.unpack(), other.unpack())
+
+    def __str__(self):
+        return self.to_string()
+
+    def __repr__(self):
+        return f"PackedBits(length={self.length}, size={self.size}, nbytes={self.data.nbytes})"
+
+
+# Компактная нагрузка: матрица модулей QR-кода (без рамки) вместо растрового изображения.
+# Бит 1 – белый модуль, 0 – черный (как в растровой нагрузке). size – (модулей, модулей),
+# version и border – версия QR-кода и ширина рамки в модулях; рамка всегда белая, поэтому
+# не встраивается, а добавляется заново в modules() и to_image(). Растровое изображение
+# восстанавливается на стороне получателя в любом масштабе.
+class QRModulePayload(PackedBits):
+    def __init__(self, data, length, size, version, border):
+        super().__init__(data, length, size)
+        self.version = int(version)
+        self.border = int(border)
+
+    # Из булевой матрицы модулей кода без рамки (True – черный модуль)
+    @classmethod
+    def from_modules(cls, modules, version, border):
+        modules = np.asarray(modules, dtype=bool)
+        return cls(np.packbits(~modules), modules.size, (modules.shape[1], modules.shape[0]), version, border)
+
+    # Из извлечённых битов и известных метаданных
+    @classmethod
+    def from_bits(cls, bits, size, version, border):
+        bits = as_packed(bits)
+        return cls(bits.data, bits.length, size, version, border)
+
+    # Матрица модулей с рамкой из border белых модулей (True – черный модуль)
+    def modules(self):
+        width, height = self.size
+        return np.pad(self.unpack().reshape(height, width) == 0, self.border)
+
+    # Растровое изображение режима '1': scale пикселей на модуль или произвольный размер size.
+    # Без параметров – один пиксель на модуль.
+    def to_image(self, size=None, scale=None):
+        white = ~self.modules()
+        if scale is not None:
+            white = white.repeat(scale, axis=0).repeat(scale, axis=1)
+        img = Image.fromarray(white)
+        if size is not None and img.size != tuple(size):
+            img = img.resize(tuple(size), Image.NEAREST)
+        return img
+
+    def __repr__(self):
+        return (f"QRModulePayload(length={self.length}, size={self.size}, "
+                f"version={self.version}, border={self.border})")
+
+
+# Приводим любую поддерживаемую форму нагрузки (PackedBits, строка, массив) к PackedBits
+def as_packed(data_bits, size=None):
+    if isinstance(data_bits, PackedBits):
+        return data_bits
+    if isinstance(data_bits, str):
+        return PackedBits.from_string(data_bits, size)
+    return PackedBits.from_array(data_bits, size)
@@ -0,0 +1,135 @@
+import numpy as np
+
+from qr_gen import make_qr_image, make_qr_modules
+from payload import PackedBits, QRModulePayload
+from metrics import as_rgb_array, compute_metrics
+from lsb_engine import DEFAULT_LAYOUT, embed_layout_array, extract_layout_array, save_rgb_array
+from stego_header import embed_with_header, extract_with_header
+from scatter import embed_scattered_array, extract_scattered_array
+
+
+# Конвейер генерация -> кодирование -> встраивание -> извлечение -> проверка -> метрики в памяти.
+# Каждый этап можно вызвать отдельно; результаты этапов хранятся в атрибутах объекта.
+# На диск ничего не пишется, пока явно не вызван save().
+class StegoPipeline:
+    # qr_size=None – компактный режим: встраивается матрица модулей QR-кода, а не растр.
+    # layout – схема встраивания (EmbeddingLayout), по умолчанию младший бит синего канала.
+    # header=True – перед нагрузкой пишется самоописывающий заголовок (stego_header), и для
+    # извлечения не нужно знать длину, размер QR-кода и схему встраивания. По умолчанию (None)
+    # заголовок пишется в компактном режиме без ключа – в нём же хранятся версия QR и рамка.
+    # key – секретный ключ: нагрузка рассеивается по пикселям в псевдослучайном порядке (scatter).
+    def __init__(self, qr_size=(100, 100), layout=DEFAULT_LAYOUT, cache=None, header=None, key=None):
+        if header and key is not None:
+            raise ValueError("Заголовок и рассеивание по ключу не используются вместе")
+        if header is None:
+            header = qr_size is None and key is None
+        self.qr_size = qr_size
+        self.layout = layout
+        self.header = header
+        self.key = key
+        self.cache = cache  # QRPayloadCache: повторяющиеся данные не генерируются заново
+        self.qr_image = None
+        self.payload = None
+        self.container = None
+        self.stego = None
+        self.embedded_bits = 0
+        self.extracted = None
+
+    # 1. QR-код как изображение режима '1' (без сохранения в файл)
+    def generate(self, data):
+        self.qr_image = make_qr_image(data, self.qr_size)
+        return self.qr_image
+
+    # 2. Изображение QR-кода -> PackedBits
+    def encode(self, qr_image=None):
+        if qr_image is not None:
+            self.qr_image = qr_image
+        self.payload = PackedBits.from_image(self.qr_image)
+        return self.payload
+
+    # 1+2. Нагрузка для данных: из кэша, если он задан, иначе генерация и кодирование
+    def encode_data(self, data):
+        if self.cache is not None:
+            self.qr_image = None
+            self.payload = self.cache.get(data, self.qr_size)
+        elif self.qr_size is None:
+            self.qr_image = None
+            self.payload = make_qr_modules(data)
+        else:
+            self.generate(data)
+            self.encode()
+        return self.payload
+
+    # 3. Встраивание в копию контейнера (путь, PIL.Image или массив (H, W, 3))
+    def embed(self, container, payload=None):
+        if payload is not None:
+            self.payload = payload
+        self.container = as_rgb_array(container)
+        self.stego = np.array(self.container, dtype=np.uint8, order='C')
+        if self.header:
+            self.embedded_bits = embed_with_header(self.stego, self.payload, self.layout)
+        elif self.key is not None:
+            self.embedded_bits = embed_scattered_array(self.stego, self.payload, self.key, self.layout)
+        else:
+            self.embedded_bits = embed_layout_array(self.stego, self.payload, self.layout)
+        return self.stego
+
+    # 4. Извлечение num_bits бит (по умолчанию – длина нагрузки) из стего-массива.
+    # Без заголовка получатель, у которого нет исходной нагрузки, передаёт num_bits,
+    # а в компактном режиме ещё версию QR-кода и рамку (version, border).
+    def extract(self, stego=None, num_bits=None, version=None, border=None):
+        if stego is not None:
+            self.stego = np.ascontiguousarray(as_rgb_array(stego))
+        if self.header:
+            self.extracted = extract_with_header(self.stego)
+            return self.extracted
+        compact = isinstance(self.payload, QRModulePayload) or (self.payload is None and self.qr_size is None)
+        if compact and self.payload is None:
+            if version is None or border is None:
+                raise ValueError("Без заголовка для компактной нагрузки нужно указать version и border")
+            side = 17 + 4 * version  # рамка не встраивается: она нужна только для восстановления изображения
+            if num_bits is not None and num_bits != side * side:
+                raise ValueError(f"Для версии {version} нагрузка занимает {side * side} бит, а не {num_bits}")
+            num_bits, size = side * side, (side, side)
+        elif compact:
+            version, border, size = self.payload.version, self.payload.border, self.payload.size
+        if num_bits is None:
+            if self.payload is None:
+                raise ValueError("Без заголовка нужно указать число бит нагрузки num_bits")
+            num_bits = len(self.payload)
+        if self.key is not None:
+            bits = extract_scattered_array(self.stego, num_bits, self.key, self.layout)
+        else:
+            bits = extract_layout_array(self.stego, num_bits, self.layout)
+        if compact:
+            self.extracted = QRModulePayload.from_bits(PackedBits.from_array(bits), size, version, border)
+        else:
+            size = self.payload.size if self.payload is not None else None
+            self.extracted = PackedBits.from_array(bits, size)
+        return self.extracted
+
+    # 5. Совпадают ли извлечённые биты с исходной нагрузкой
+    def verify(self):
+        return self.extracted == self.payload
+
+    # 6. Метрики качества по массивам в памяти
+    def metrics(self):
+        return compute_metrics(self.container, self.stego)
+
+    # Полный прогон всех этапов; возвращает сводку
+    def run(self, data, container):
+        self.encode_data(data)
+        self.embed(container)
+        self.extract()
+        return {'embedded_bits': self.embedded_bits, 'payload_bits': len(self.payload),
+                'verified': self.verify(), **self.metrics()}
+
+    # Явное сохранение результатов на диск; сохраняются только переданные пути
+    def save(self, stego_path=None, qr_path=None, recovered_path=None):
+        if stego_path is not None:
+            save_rgb_array(self.stego, stego_path)
+        if qr_path is not None:
+            (self.qr_image or self.payload.to_image()).save(qr_path)
+        if recovered_path is not None:
+            # В компактном режиме QR-код сохраняется по пикселю на модуль
+            self.extracted.to_image().save(recovered_path)
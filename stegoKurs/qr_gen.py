@@ -0,0 +1,111 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+import qrcode
+
+from payload import PackedBits, QRModulePayload
+from instrument import timed
+
+
+# Генерация QR-кода в памяти: бинарное (черно-белое) изображение режима '1' размером qr_size
+@timed('qr_generate')
+def make_qr_image(data, qr_size=(200, 200), error_correction=qrcode.constants.ERROR_CORRECT_L, version=None):
+    qr = qrcode.QRCode(version=version, error_correction=error_correction)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").convert('1')
+    return img.resize(qr_size)
+
+
+# Компактная нагрузка: матрица модулей QR-кода без рамки (21x21 модуль для версии 1)
+# вместо растра qr_size – в десятки раз меньше бит при том же содержимом. Рамка border
+# передаётся как метаданные и добавляется при восстановлении изображения.
+@timed('qr_generate')
+def make_qr_modules(data, error_correction=qrcode.constants.ERROR_CORRECT_L, version=None, border=4):
+    qr = qrcode.QRCode(version=version, error_correction=error_correction, border=0)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return QRModulePayload.from_modules(qr.get_matrix(), qr.version, border)
+
+
+# LRU-кэш готовых нагрузок (PackedBits) для QR-кодов.
+# Ключ – (data, qr_size, error_correction, version); qr_size=None – компактная
+# нагрузка из модулей QR-кода (make_qr_modules). При заданном cache_dir записи
+# дополнительно сохраняются на диск в .npz и переживают перезапуск процесса.
+class QRPayloadCache:
+    def __init__(self, maxsize=128, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, data, qr_size=(100, 100), error_correction=qrcode.constants.ERROR_CORRECT_L, version=None):
+        key = (data, tuple(qr_size) if qr_size is not None else None, error_correction, version)
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+        payload = self._load(key)
+        if payload is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            payload = self._make(data, qr_size, error_correction, version)
+            self._store(key, payload)
+
+        payload.data.flags.writeable = False  # объект общий для всех вызывающих
+        self._entries[key] = payload
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return payload
+
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.disk_hits = self.misses = 0
+
+    @staticmethod
+    def _make(data, qr_size, error_correction, version):
+        if qr_size is None:
+            return make_qr_modules(data, error_correction, version)
+        return PackedBits.from_image(make_qr_image(data, qr_size, error_correction, version))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(repr(key).encode('utf-8')).hexdigest() + '.npz')
+
+    def _load(self, key):
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        with np.load(self._path(key)) as f:
+            if 'qr_version' in f:
+                return QRModulePayload(f['data'], int(f['length']), tuple(int(v) for v in f['size']),
+                                       int(f['qr_version']), int(f['border']))
+            return PackedBits(f['data'], int(f['length']), tuple(int(v) for v in f['size']))
+
+    def _store(self, key, payload):
+        if self.cache_dir is None:
+            return
+        # Запись через временный файл, чтобы параллельные процессы не прочитали недописанный кэш
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fields = {'data': payload.data, 'length': payload.length, 'size': payload.size}
+        if isinstance(payload, QRModulePayload):
+            fields.update(qr_version=payload.version, border=payload.border)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **fields)
+        os.replace(tmp_path, path)
+
+
+# Общий кэш процесса
+qr_payload_cache = QRPayloadCache()
@@ -0,0 +1,64 @@
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+from lsb_engine import DEFAULT_LAYOUT, bits_to_array, embed_layout_array, extract_layout_array, pixels_touched
+
+
+SCATTER_CACHE_SIZE = 8  # сколько перестановок держать в памяти (LRU); перестановка – 4 байта на пиксель
+
+
+# Зерно генератора из ключа (строка или байты)
+def key_seed(key):
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], 'little')
+
+
+# Перестановка всех пикселей изображения shape (H, W) для ключа: строится одним вызовом
+# генератора NumPy и кэшируется по (key, shape)
+@lru_cache(maxsize=SCATTER_CACHE_SIZE)
+def _permutation(key, shape):
+    num_pixels = shape[0] * shape[1]
+    index = np.random.default_rng(key_seed(key)).permutation(num_pixels)
+    index = index.astype(np.int32 if num_pixels < 2 ** 31 else np.int64)
+    index.flags.writeable = False  # массив общий для всех вызывающих
+    return index
+
+
+# Порядок обхода пикселей для ключа: первые length номеров перестановки. Порядок не зависит
+# от length, поэтому извлечение любого начала нагрузки читает те же пиксели, что и встраивание.
+def scatter_index(key, shape, length):
+    num_pixels = shape[0] * shape[1]
+    if length > num_pixels:
+        raise ValueError(f"Нельзя выбрать {length} пикселей из {num_pixels}")
+    return _permutation(key, tuple(shape))[:length]
+
+
+# Статистика кэша перестановок (hits, misses, maxsize, currsize)
+def scatter_cache_info():
+    return _permutation.cache_info()
+
+
+# Встраивание в пиксели, выбранные по ключу: выбранные пиксели собираются fancy-индексацией
+# в плотный массив, в него пишется нагрузка по схеме layout, и пиксели возвращаются на место
+def embed_scattered_array(rgb, data_bits, key, layout=DEFAULT_LAYOUT):
+    if not rgb.flags.c_contiguous:
+        raise ValueError("Массив контейнера должен быть непрерывным (C-contiguous)")
+    flat = rgb.reshape(-1, rgb.shape[-1])
+    bits = bits_to_array(data_bits)
+    n = min(bits.size, layout.capacity(flat.shape[0], 1))
+    index = scatter_index(key, rgb.shape[:2], pixels_touched(n, flat.shape[0], layout))
+    selected = flat[index]
+    embed_layout_array(selected, bits[:n], layout)
+    flat[index] = selected
+    return n
+
+
+# Извлечение num_bits бит из пикселей, выбранных по тому же ключу
+def extract_scattered_array(rgb, num_bits, key, layout=DEFAULT_LAYOUT):
+    flat = rgb.reshape(-1, rgb.shape[-1])
+    n = min(num_bits, layout.capacity(flat.shape[0], 1))
+    index = scatter_index(key, rgb.shape[:2], pixels_touched(n, flat.shape[0], layout))
+    return extract_layout_array(flat[index], n, layout)
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+
+from metrics import CHANNEL_NAMES
+from lsb_engine import load_rgb_array
+
+
+DEFAULT_SEGMENTS = 100  # на сколько частей делится изображение для последовательной атаки хи-квадрат
+MIN_EXPECTED = 5  # пары значений с меньшим ожидаемым числом в статистику не входят
+RS_MASK = np.array([0, 1, 1, 0])  # маска RS-анализа для групп из 4 соседних пикселей строки
+RS_SIGMAS = 3  # RM - SM в пределах стольких стандартных ошибок от нуля считается нулём
+
+
+# Вероятность P(X >= x) для распределения хи-квадрат с df степенями свободы
+# (приближение Уилсона – Хилферти; при df > 30 точность – третий знак и лучше)
+def chi2_sf(x, df):
+    x, df = np.asarray(x, dtype=np.float64), np.asarray(df, dtype=np.float64)
+    df = np.maximum(df, 1)
+    z = (np.cbrt(x / df) - (1 - 2 / (9 * df))) / np.sqrt(2 / (9 * df))
+    return 0.5 * np.vectorize(math.erfc)(z / math.sqrt(2))
+
+
+# Атака хи-квадрат (Westfeld – Pfitzmann) сразу для всех начальных отрезков канала.
+# Канал делится по строкам на segments полос в порядке обхода; гистограмма каждой полосы –
+# один bincount, гистограммы префиксов – их cumsum. Кроме самих гистограмм (segments x 256)
+# больших временных массивов нет. Возвращает массив p: p[i] – вероятность встраивания
+# в первые i + 1 полос.
+def chi_square_attack(plane, segments=DEFAULT_SEGMENTS):
+    segments = max(1, min(segments, plane.shape[0]))
+    hist = np.array([np.bincount(band.reshape(-1), minlength=256) for band in np.array_split(plane, segments)])
+    hist = np.cumsum(hist, axis=0, dtype=np.int64)
+
+    observed = hist[:, 0::2].astype(np.float64)
+    expected = (hist[:, 0::2] + hist[:, 1::2]) / 2
+    used = expected >= MIN_EXPECTED
+    terms = np.where(used, (observed - expected) ** 2 / np.where(used, expected, 1), 0)
+    return chi2_sf(terms.sum(axis=1), used.sum(axis=1) - 1)
+
+
+# Доля изображения от начала, в которой атака хи-квадрат видит встраивание: до последнего
+# префикса с p >= threshold, поэтому короткие провалы p в начале не обрывают оценку
+def embedded_fraction(p_values, threshold=0.5):
+    above = np.flatnonzero(p_values >= threshold)
+    return (above[-1] + 1) / p_values.size if above.size else 0.0
+
+
+# Функция гладкости групп: сумма модулей разностей соседних пикселей группы.
+# groups – массив (размер группы, число групп): i-й пиксель всех групп лежит подряд.
+def _smoothness(groups):
+    return sum(np.abs(groups[i + 1] - groups[i]) for i in range(len(groups) - 1))
+
+
+# Доли регулярных и сингулярных групп для маски mask (1 – переворот F1, -1 – сдвинутый переворот F-1)
+def _rs_counts(groups, mask):
+    base = _smoothness(groups)
+    flipped = [g ^ 1 if m == 1 else ((g + 1) ^ 1) - 1 if m == -1 else g for g, m in zip(groups, mask)]
+    changed = _smoothness(flipped)
+    return np.count_nonzero(changed > base) / base.size, np.count_nonzero(changed < base) / base.size
+
+
+# RS-анализ (Fridrich, Goljan, Du): оценка доли пикселей канала, младшие биты которых заменены
+# сообщением. Все группы канала (по 4 соседних пикселя строки) обрабатываются одним массивом.
+def rs_analysis(plane, mask=RS_MASK):
+    width = plane.shape[1] // mask.size * mask.size
+    if width == 0:
+        return {'rate': 0.0, 'rm': 0.0, 'sm': 0.0, 'r_neg': 0.0, 's_neg': 0.0}
+    groups = plane[:, :width].astype(np.int16).reshape(-1, mask.size).T.copy()
+    rm, sm = _rs_counts(groups, mask)
+    r_neg, s_neg = _rs_counts(groups, -mask)
+    # Те же доли для изображения с перевёрнутыми младшими битами
+    rm1, sm1 = _rs_counts(groups ^ 1, mask)
+    r_neg1, s_neg1 = _rs_counts(groups ^ 1, -mask)
+
+    d0, d1 = rm - sm, rm1 - sm1
+    n0, n1 = r_neg - s_neg, r_neg1 - s_neg1
+    if d0 <= RS_SIGMAS * math.sqrt((rm + sm) / groups.shape[1]):
+        # RM ≈ SM: младшие биты неотличимы от случайных. Это полное встраивание – особая точка
+        # уравнения, где оценка по корню неустойчива, поэтому доля сразу равна 1
+        rate = 1.0
+    else:
+        a, b, c = 2 * (d1 + d0), n0 - n1 - d1 - 3 * d0, d0 - n0
+        if abs(a) < 1e-12:
+            x = -c / b if abs(b) > 1e-12 else 0.0
+        else:
+            disc = max(b * b - 4 * a * c, 0.0)
+            roots = ((-b + math.sqrt(disc)) / (2 * a), (-b - math.sqrt(disc)) / (2 * a))
+            x = min(roots, key=abs)
+        rate = x / (x - 0.5) if abs(x - 0.5) > 1e-12 else 1.0
+    return {'rate': float(min(max(rate, 0.0), 1.0)), 'rm': float(rm), 'sm': float(sm),
+            'r_neg': float(r_neg), 's_neg': float(s_neg)}
+
+
+# Отчёт по одному изображению: для каждого канала – p атаки хи-квадрат для всего канала,
+# доля канала с признаками встраивания, оценка RS и итоговая оценка обнаружимости (0..1).
+# Оценка – доля RS: на гладких изображениях с шумом атака хи-квадрат насыщается (p ≈ 1) и без
+# встраивания, поэтому её результаты даются отдельными полями и на оценку не влияют.
+def analyze_image(image, channels=(0, 1, 2), segments=DEFAULT_SEGMENTS):
+    rgb = image if isinstance(image, np.ndarray) else load_rgb_array(image)
+    report = {'width': rgb.shape[1], 'height': rgb.shape[0], 'channels': {}}
+    for channel in channels:
+        plane = rgb[..., channel]
+        p_values = chi_square_attack(plane, segments)
+        fraction = embedded_fraction(p_values)
+        rs = rs_analysis(plane)
+        report['channels'][CHANNEL_NAMES[channel]] = {
+            'chi2_p': float(p_values[-1]),
+            'chi2_embedded_fraction': float(fraction),
+            'rs_rate': rs['rate'],
+            'rs_groups': {key: rs[key] for key in ('rm', 'sm', 'r_neg', 's_neg')},
+            'score': rs['rate'],
+        }
+    report['score'] = max(c['score'] for c in report['channels'].values())
+    return report
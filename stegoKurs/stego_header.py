@@ -0,0 +1,187 @@
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from payload import PackedBits, QRModulePayload, as_packed
+from lsb_engine import (DEFAULT_LAYOUT, EmbeddingLayout, bits_to_array, load_rgb_array,
+                        embed_layout_array, extract_layout_array, pixels_touched)
+from block_codec import repeat_bits, majority_decode
+from bmp_mmap import map_bmp_rows, read_bmp_header
+
+
+# Заголовок в начале стего-изображения:
+#   magic 'KSTG', версия формата, тип нагрузки, схема встраивания (каналы, бит на канал, порядок),
+#   размер кратности повторения, размер QR-кода, длина нагрузки в битах,
+#   версия QR и рамка (для нагрузки из модулей), CRC32 нагрузки.
+MAGIC = b'KSTG'
+FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct('>4sBBBBBHHHIBBI')
+HEADER_BITS = HEADER_STRUCT.size * 8
+# Заголовок всегда пишется в младшие биты R, G, B подряд – так его можно прочитать,
+# не зная схемы встраивания нагрузки; нагрузка начинается со следующего пикселя
+HEADER_LAYOUT = EmbeddingLayout((0, 1, 2), 1, 'pixel')
+HEADER_PIXELS = -(-HEADER_BITS // HEADER_LAYOUT.bits_per_pixel)
+MAGIC_PIXELS = -(-len(MAGIC) * 8 // HEADER_LAYOUT.bits_per_pixel)
+
+KIND_BITS, KIND_RASTER, KIND_MODULES = 0, 1, 2
+
+
+# CRC32 упакованной нагрузки (биты после конца нагрузки в последнем байте обнуляются)
+def payload_crc(payload):
+    data = payload.data[:(payload.length + 7) // 8].copy()
+    if payload.length % 8:
+        data[-1] &= (0xFF << (8 - payload.length % 8)) & 0xFF
+    return zlib.crc32(data.tobytes())
+
+
+# Порядок каналов упаковывается в один байт: число каналов и по 2 бита на номер канала
+def _pack_channels(channels):
+    value = len(channels) << 6
+    for i, c in enumerate(channels):
+        value |= c << (2 * i)
+    return value
+
+
+def _unpack_channels(value):
+    return tuple((value >> (2 * i)) & 3 for i in range(value >> 6))
+
+
+# Сборка байтов заголовка для нагрузки
+def build_header(payload, layout=DEFAULT_LAYOUT, block_size=1):
+    payload = as_packed(payload)
+    width, height = payload.size or (0, 0)
+    if isinstance(payload, QRModulePayload):
+        kind, qr_version, border = KIND_MODULES, payload.version, payload.border
+    else:
+        kind, qr_version, border = (KIND_RASTER if payload.size else KIND_BITS), 0, 0
+    return HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, kind, _pack_channels(layout.channels),
+                              layout.bits_per_channel, EmbeddingLayout.ORDERS.index(layout.order),
+                              block_size, width, height, payload.length, qr_version, border,
+                              payload_crc(payload))
+
+
+# Разбор заголовка; ValueError, если это не стего-изображение или формат не поддерживается
+def parse_header(data):
+    (magic, version, kind, channels, bits_per_channel, order, block_size,
+     width, height, length, qr_version, border, crc) = HEADER_STRUCT.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("Заголовок стего-данных не найден")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {version}")
+    if order >= len(EmbeddingLayout.ORDERS) or block_size == 0:
+        raise ValueError("Повреждённый заголовок стего-данных")
+    return {
+        'kind': kind,
+        'layout': EmbeddingLayout(_unpack_channels(channels), bits_per_channel, EmbeddingLayout.ORDERS[order]),
+        'block_size': block_size,
+        'size': (width, height) if width and height else None,
+        'length': length,
+        'qr_version': qr_version,
+        'border': border,
+        'crc': crc,
+    }
+
+
+# Число пикселей после заголовка, которые занимает нагрузка
+def payload_pixels(header, num_pixels):
+    slots = header['length'] * header['block_size']
+    return pixels_touched(slots, num_pixels - HEADER_PIXELS, header['layout'])
+
+
+# Встраивание заголовка и нагрузки в массив (H, W, 3) на месте. Возвращает число записанных бит нагрузки.
+def embed_with_header(rgb, payload, layout=DEFAULT_LAYOUT, block_size=1):
+    if not rgb.flags.c_contiguous:
+        raise ValueError("Массив контейнера должен быть непрерывным (C-contiguous)")
+    payload = as_packed(payload)
+    flat = rgb.reshape(-1, rgb.shape[-1])
+    capacity = layout.capacity(flat.shape[0] - HEADER_PIXELS, 1) // block_size
+    if payload.length > capacity:
+        raise ValueError(f"Нагрузка {payload.length} бит не помещается в контейнер ({capacity} бит)")
+
+    header_bits = np.unpackbits(np.frombuffer(build_header(payload, layout, block_size), dtype=np.uint8))
+    embed_layout_array(flat[:HEADER_PIXELS], header_bits, HEADER_LAYOUT)
+    bits = repeat_bits(payload, block_size) if block_size > 1 else bits_to_array(payload)
+    embed_layout_array(flat[HEADER_PIXELS:], bits, layout)
+    return payload.length
+
+
+# Первые rows строк изображения как массив (rows, W, 3) RGB. Для несжатых 24-битных BMP
+# отображаются в память только эти строки, для остальных форматов изображение декодируется целиком.
+def _leading_rows(source, rows):
+    if isinstance(source, np.ndarray):
+        return source[:rows]
+    try:
+        _, view = map_bmp_rows(source, rows, mode='r')
+        return view[..., ::-1]  # BGR -> RGB
+    except ValueError:
+        return load_rgb_array(source)[:rows]
+
+
+# Источник для нескольких чтений подряд: несжатый 24-битный BMP остаётся путём (нужные строки
+# отображаются в память при каждом чтении), остальные форматы декодируются в массив один раз
+def _resolve_source(source):
+    if isinstance(source, np.ndarray):
+        return source
+    try:
+        read_bmp_header(source)
+    except ValueError:
+        return load_rgb_array(source)
+    return source
+
+
+# Ширина и высота источника без декодирования пикселей
+def _source_size(source):
+    if isinstance(source, np.ndarray):
+        return source.shape[1], source.shape[0]
+    with Image.open(source) as img:
+        return img.size
+
+
+# Первые count пикселей в порядке обхода – массив (count, 3)
+def _leading_pixels(source, count, width):
+    rows = _leading_rows(source, -(-count // width))
+    return np.ascontiguousarray(rows).reshape(-1, 3)[:count]
+
+
+# Быстрая проверка «это стего-изображение?»: читаются только первые MAGIC_PIXELS пикселей
+def is_stego(source):
+    width, height = _source_size(source)
+    if width * height < HEADER_PIXELS:
+        return False
+    bits = extract_layout_array(_leading_pixels(source, MAGIC_PIXELS, width), len(MAGIC) * 8, HEADER_LAYOUT)
+    return np.packbits(bits).tobytes() == MAGIC
+
+
+# Чтение заголовка: только первые HEADER_PIXELS пикселей
+def read_header(source):
+    width, height = _source_size(source)
+    if width * height < HEADER_PIXELS:
+        raise ValueError("Изображение слишком мало для заголовка стего-данных")
+    bits = extract_layout_array(_leading_pixels(source, HEADER_PIXELS, width), HEADER_BITS, HEADER_LAYOUT)
+    return parse_header(np.packbits(bits).tobytes())
+
+
+# Извлечение нагрузки по заголовку: читаются только строки, содержащие заголовок и нагрузку.
+# Возвращает PackedBits (QRModulePayload для нагрузки из модулей); при несовпадении CRC – ValueError.
+def extract_with_header(source):
+    source = _resolve_source(source)
+    width, height = _source_size(source)
+    header = read_header(source)
+    if header['length'] * header['block_size'] > header['layout'].capacity(width * height - HEADER_PIXELS, 1):
+        raise ValueError("Повреждённый заголовок: длина нагрузки больше ёмкости изображения")
+
+    pixels = _leading_pixels(source, HEADER_PIXELS + payload_pixels(header, width * height), width)
+    slots = extract_layout_array(pixels[HEADER_PIXELS:], header['length'] * header['block_size'], header['layout'])
+    if header['block_size'] > 1:
+        slots, _ = majority_decode(slots, header['length'], header['block_size'])
+
+    if header['kind'] == KIND_MODULES:
+        payload = QRModulePayload(np.packbits(slots), header['length'], header['size'],
+                                  header['qr_version'], header['border'])
+    else:
+        payload = PackedBits(np.packbits(slots), header['length'], header['size'])
+    if payload_crc(payload) != header['crc']:
+        raise ValueError("Контрольная сумма нагрузки не совпадает")
+    return payload
@@ -0,0 +1,98 @@
+import shutil
+
+import numpy as np
+
+from lsb_engine import BLUE
+from payload import PackedBits, as_packed
+from bmp_mmap import read_bmp_header, same_file, write_plane_lsb
+from instrument import stage
+
+
+DEFAULT_BAND_BYTES = 8 * 1024 * 1024  # максимальный размер полосы строк, читаемой за раз
+
+
+# Число строк в полосе, чтобы полоса не превышала band_bytes
+def band_rows_for(header, band_bytes=DEFAULT_BAND_BYTES):
+    return max(1, band_bytes // header['row_stride'])
+
+
+# Читаем полосу хранимых строк [first, first + rows) в изменяемый массив (rows, stride)
+def _read_stored_rows(f, header, first, rows):
+    f.seek(header['offset'] + first * header['row_stride'])
+    buf = bytearray(f.read(rows * header['row_stride']))
+    return np.frombuffer(buf, dtype=np.uint8).reshape(rows, header['row_stride'])
+
+
+# Вид полосы (rows, W, 3) в порядке BGR и в порядке строк изображения (сверху вниз)
+def _band_pixels(band, header):
+    view = band[:, :header['width'] * 3].reshape(band.shape[0], header['width'], 3)
+    return view if header['top_down'] else view[::-1]
+
+
+# Перебираем полосы изображения сверху вниз: (номер первой строки изображения, вид (rows, W, 3) BGR).
+# max_rows ограничивает обход первыми строками изображения.
+def iter_bmp_bands(path, band_bytes=DEFAULT_BAND_BYTES, max_rows=None, header=None):
+    header = header or read_bmp_header(path)
+    height = header['height']
+    total = height if max_rows is None else min(max_rows, height)
+    step = band_rows_for(header, band_bytes)
+
+    with open(path, 'rb') as f:
+        for y0 in range(0, total, step):
+            rows = min(step, total - y0)
+            # В bottom-up BMP строки изображения y0..y0+rows-1 хранятся в обратном порядке в конце файла
+            first = y0 if header['top_down'] else height - y0 - rows
+            yield y0, _band_pixels(_read_stored_rows(f, header, first, rows), header)
+
+
+# Потоковое встраивание: контейнер читается полосами, в каждую полосу записывается
+# попадающая в неё часть нагрузки, и полоса сразу пишется в выходной файл.
+# Пиковая память ограничена band_bytes (плюс упакованная нагрузка – 1 бит на бит).
+def stream_embed_bmp(container_path, data_bits, output_path, band_bytes=DEFAULT_BAND_BYTES, channel=BLUE):
+    if same_file(container_path, output_path):
+        raise ValueError("Потоковое встраивание пишет новый файл; для записи на месте используйте embed_bits_bmp")
+    header = read_bmp_header(container_path)
+    width, height, stride = header['width'], header['height'], header['row_stride']
+    payload = as_packed(data_bits)
+    n = min(payload.length, width * height)
+    step = band_rows_for(header, band_bytes)
+
+    with stage('embed') as st, open(container_path, 'rb') as src, open(output_path, 'wb') as dst:
+        dst.write(src.read(header['offset']))
+        # Полосы идут в порядке хранения в файле, чтобы выходной файл писался последовательно
+        for first in range(0, height, step):
+            rows = min(step, height - first)
+            band = _read_stored_rows(src, header, first, rows)
+            y0 = first if header['top_down'] else height - first - rows
+            start, end = y0 * width, min(n, (y0 + rows) * width)
+            if start < end:
+                plane = _band_pixels(band, header)[..., 2 - channel]
+                write_plane_lsb(plane, payload.unpack_range(start, end))
+            dst.write(band.data)
+        # Данные после массива пикселей (если есть) копируем без изменений
+        src.seek(header['offset'] + height * stride)
+        shutil.copyfileobj(src, dst)
+        st.add(pixels=width * height, bits=n, bytes_read=src.tell(), bytes_written=dst.tell())
+
+    return n
+
+
+# Потоковое извлечение: читаются только полосы, содержащие нагрузку.
+# Биты упаковываются по мере чтения, результат – PackedBits.
+def stream_extract_bmp(path, num_bits, band_bytes=DEFAULT_BAND_BYTES, channel=BLUE):
+    header = read_bmp_header(path)
+    width = header['width']
+    num_bits = min(num_bits, width * header['height'])
+
+    rows = -(-num_bits // width)
+    with stage('extract') as st:
+        packed, carry = [], np.zeros(0, dtype=np.uint8)
+        for y0, pixels in iter_bmp_bands(path, band_bytes, max_rows=rows, header=header):
+            band_bits = pixels[..., 2 - channel].reshape(-1)[:num_bits - y0 * width] & 1
+            bits = np.concatenate((carry, band_bits))
+            aligned = bits.size // 8 * 8
+            packed.append(np.packbits(bits[:aligned]))
+            carry = bits[aligned:]
+        packed.append(np.packbits(carry))
+        st.add(pixels=num_bits, bits=num_bits, bytes_read=rows * header['row_stride'])
+    return PackedBits(np.concatenate(packed), num_bits)
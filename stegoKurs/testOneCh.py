@@ -2,6 +2,10 @@ import numpy as np
 from PIL import Image
 import qrcode
 
+from payload import PackedBits, as_packed
+from metrics import compute_metrics
+from lsb_engine import load_rgb_array, save_rgb_array, embed_bits_array, extract_bits_array
+
 
 # Функция для генерации QR-кода и сохранения его в виде бинарного (черно-белого) изображения
 def generate_qr_code(data, qr_path, qr_size=(200, 200)):
@@ -13,136 +17,45 @@ def generate_qr_code(data, qr_path, qr_size=(200, 200)):
     img.save(qr_path)
 
 
-# Преобразуем изображение (QR-код) в строку битов.
+# Преобразуем изображение (QR-код) в упакованный набор битов (PackedBits).
 def image_to_bits(image_path):
     img = Image.open(image_path)
-    img = img.convert('1')  # черно-белое изображение
-    pixels = img.load()
-    bits = ""
-    for y in range(img.height):
-        for x in range(img.width):
-            # В режиме '1': 0 – черный, 255 – белый.
-            bit = '0' if pixels[x, y] == 0 else '1'
-            bits += bit
+    # В режиме '1': 0 – черный, 1 – белый; вся картинка упаковывается одной операцией
+    bits = PackedBits.from_image(img)
     return bits, img.size  # возвращаем также размеры для восстановления
 
 
 # Скрываем битовую строку в синем канале контейнерного изображения
 def hide_data_in_blue_channel(image_path, data_bits, output_image_path):
-    img = Image.open(image_path)
-    img = img.convert('RGB')
-    pixels = img.load()
+    rgb = load_rgb_array(image_path)
 
     data_len = len(data_bits)
-    data_index = 0
-
-    for y in range(img.height):
-        for x in range(img.width):
-            if data_index >= data_len:
-                break
-
-            r, g, b = pixels[x, y]
-            # Модифицируем только синий канал (b)
-            b = (b & 0xFE) | int(data_bits[data_index])
-            data_index += 1
-
-            pixels[x, y] = (r, g, b)
-        if data_index >= data_len:
-            break
+    # Модифицируем только синий канал (b) — одной векторной операцией
+    data_index = embed_bits_array(rgb, data_bits)
 
-    img.save(output_image_path)
+    save_rgb_array(rgb, output_image_path)
     print(f"Скрыто {data_index} бит из {data_len} бит в синем канале.")
 
 
 # Извлечение битов из синего канала изображения
 def extract_data_from_blue_channel(image_path, num_bits):
-    img = Image.open(image_path)
-    img = img.convert('RGB')
-    pixels = img.load()
-
-    extracted_bits = ""
-    for y in range(img.height):
-        for x in range(img.width):
-            if len(extracted_bits) >= num_bits:
-                break
-            _, _, b = pixels[x, y]
-            extracted_bits += str(b & 1)
-        if len(extracted_bits) >= num_bits:
-            break
-
-    return extracted_bits
+    rgb = load_rgb_array(image_path)
+    return PackedBits.from_array(extract_bits_array(rgb, num_bits))
 
 
-# Восстановление изображения QR-кода из битовой строки
+# Восстановление изображения QR-кода из битов (PackedBits или строки '0'/'1')
 def bits_to_image(bits, size, output_path):
-    width, height = size
-    img = Image.new('1', (width, height))
-    pixels = img.load()
-
-    index = 0
-    for y in range(height):
-        for x in range(width):
-            if index < len(bits):
-                pixels[x, y] = 0 if bits[index] == '0' else 255
-                index += 1
-            else:
-                break
-    img.save(output_path)
+    as_packed(bits).to_image(size).save(output_path)
 
 
+# MSE только по синему каналу
 def calculate_mse(image1_path, image2_path):
-    img1 = Image.open(image1_path).convert('RGB')
-    img2 = Image.open(image2_path).convert('RGB')
-    if img1.size != img2.size:
-        raise ValueError("Изображения должны иметь одинаковые размеры!")
-
-    width, height = img1.size
-
-
-    pixels1 = img1.load()
-    pixels2 = img2.load()
-
-    # Сумма квадратов разностей
-    sum_of_squares = 0.0
-
-    # Перебираем все пиксели
-    for y in range(height):
-        for x in range(width):
-            # Берём только синий канал (индекс 2)
-            b1 = pixels1[x, y][2]
-            b2 = pixels2[x, y][2]
-            # Добавляем квадрат разности к сумме
-            sum_of_squares += (b1 - b2) ** 2
-
-    # Подставляем в формулу MSE
-    mse = sum_of_squares / (width * height)
-    return mse
+    return compute_metrics(image1_path, image2_path)['per_channel']['B']['mse']
 
+# NMSE только по синему каналу: MSE, делённое на средний квадрат значений синего канала.
+# Если все пиксели синего канала равны 0, NMSE равно бесконечности.
 def calculate_nmse(image1_path, image2_path):
-    img1 = Image.open(image1_path).convert('RGB')
-    width, height = img1.size
-    pixels1 = img1.load()
-
-    # Сумма квадратов значений синего канала
-    sum_sq = 0.0
-    for y in range(height):
-        for x in range(width):
-            b = pixels1[x, y][2]
-            sum_sq += b ** 2
-
-        # Средний квадрат значений синего канала
-        mean_sq = sum_sq / (width * height)
-
-        # Вычисляем MSE
-        mse = calculate_mse(image1_path, image2_path)
-
-        # Если mean_sq = 0 (все пиксели синего канала равны 0), NMSE становится бесконечностью
-        if mean_sq == 0:
-            nmse = float('inf')
-        else:
-            nmse = mse / mean_sq
-
-        return nmse
+    return compute_metrics(image1_path, image2_path)['per_channel']['B']['nmse']
 
 
 # Пример использования:
@@ -170,5 +83,6 @@ if __name__ == '__main__':
 
     print("Процесс завершён. Проверьте файлы:", stego_image, recovered_qr_image)
 
-    print( "MSE:", calculate_mse(container_image, stego_image))
-    print("NMSE:", calculate_nmse(container_image, stego_image))
\ No newline at end of file
+    blue = compute_metrics(container_image, stego_image)['per_channel']['B']
+    print( "MSE:", blue['mse'])
+    print("NMSE:", blue['nmse'])
\ No newline at end of file